@@ -82,6 +82,11 @@ else:
         }
     }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # File-backed test database: the in-memory default fails concurrent
+    # writers with "table is locked" instead of waiting like a real file
+    DATABASES['default'].setdefault('TEST', {})['NAME'] = BASE_DIR / 'test_db.sqlite3'
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -106,6 +111,58 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files (Uploaded images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Origin media URLs are built on (e.g. a CDN: https://cdn.example.com);
+# empty means the host of each request
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', '').rstrip('/')
+# Cache lifetime for media without a content hash in its name
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 60 * 60 * 24))
+
+
+# Cache (catalog rails). LocMem is per process; set REDIS_URL when running
+# several workers so they share cached payloads. The catalog version itself
+# is kept in the database (see shop/cache.py).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'alma-artesana',
+        }
+    }
+
+# Seconds a versioned catalog payload may live (writes invalidate it anyway)
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 60 * 60))
+
+
+# Serve product listings from an in-process snapshot (see shop/snapshot.py)
+CATALOG_SNAPSHOT = os.environ.get('CATALOG_SNAPSHOT', 'False').lower() == 'true'
+
+
+# Build product list responses from .values() rows instead of
+# ProductListSerializer (see FastProductListSerializer)
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'False').lower() == 'true'
+
+
+# Keep badge='bestseller' on the most popular products (see Product.refresh_bestsellers)
+AUTO_BESTSELLER_BADGE = os.environ.get('AUTO_BESTSELLER_BADGE', 'False').lower() == 'true'
+
+
+# Worker processes that build image variants (see shop/images.py)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# On-demand resizes (/media/resize/<w>x<h>/<path>, see shop/resize.py)
+IMAGE_RESIZE_CACHE_DIR = Path(os.environ.get('IMAGE_RESIZE_CACHE_DIR', BASE_DIR / 'cache' / 'resize'))
+IMAGE_RESIZE_CACHE_MB = int(os.environ.get('IMAGE_RESIZE_CACHE_MB', 512))
+# Uploads are never overwritten in place, so resized copies can live long
+IMAGE_RESIZE_MAX_AGE = int(os.environ.get('IMAGE_RESIZE_MAX_AGE', 60 * 60 * 24 * 365))
 
 
 # Default primary key field type
@@ -114,8 +171,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # ?page= by default, ?pagination=cursor for keyset pages
+    'DEFAULT_PAGINATION_CLASS': 'shop.pagination.ShopPagination',
     'PAGE_SIZE': 12,
+    # orjson-backed JSON, plus MessagePack via Accept: application/msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'shop.renderers.FastJSONRenderer',
+        'shop.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'shop.parsers.FastJSONParser',
+        'shop.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
@@ -2,11 +2,13 @@
 URL configuration for backend project.
 Alma Artesana E-commerce
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
+from shop.views import resize_image, serve_media
 
 # Health check / root view
 def health_check(request):
@@ -26,8 +28,17 @@ urlpatterns = [
     path('', health_check),  # ← AGREGA ESTA LÍNEA
     path('admin/', admin.site.urls),
     path('api/', include('shop.urls')),
+    # Resized media, see shop/resize.py
+    path(
+        'media/resize/<int:width>x<int:height>/<path:path>',
+        resize_image,
+        name='resize_image'
+    ),
+    # Uploaded media with byte ranges and immutable caching of hashed names
+    # (put a CDN in front via MEDIA_BASE_URL)
+    re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        serve_media,
+        name='media'
+    ),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CATALOG_SNAPSHOT:
+    # Load the in-process catalog at worker start, not on the first request
+    from shop.snapshot import catalog_snapshot  # noqa: E402
+    catalog_snapshot().products()
@@ -1,8 +1,35 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from .images import variant_url
 from .models import Category, Product, ProductImage, UserProfile, Order, OrderItem, Wishlist, CartItem
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that uses PostgreSQL's row estimate instead of
+    COUNT(*) when the list is unfiltered and the table is large
+    """
+    estimate_above = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.estimate_above:
+                return int(row[0])
+        return super().count
+
+
 class ProductImageInline(admin.TabularInline):
     """Inline for adding multiple images to a product"""
     model = ProductImage
@@ -14,7 +41,7 @@ class ProductImageInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px; max-width: 100px;" />',
-                obj.image.url
+                variant_url(obj.image_variants) or obj.image.url
             )
         return "Sin imagen"
     image_preview.short_description = "Vista previa"
@@ -39,6 +66,7 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['is_active', 'order']
     ordering = ['order', 'name']
+    # product_count is a stored column (see Category.refresh_product_counts)
 
 
 @admin.register(Product)
@@ -58,7 +86,10 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['is_active', 'is_featured', 'stock']
     list_per_page = 20
-    date_hierarchy = 'created_at'
+    list_select_related = ['category', 'primary_image']
+    # No date_hierarchy: its year/month drill-down is a DISTINCT scan of the table
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     inlines = [ProductImageInline]
 
     fieldsets = (
@@ -82,13 +113,12 @@ class ProductAdmin(admin.ModelAdmin):
     )
 
     def thumbnail(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if not primary_image:
-            primary_image = obj.images.first()
+        # Denormalized, see Product.refresh_primary_image
+        primary_image = obj.primary_image
         if primary_image:
             return format_html(
                 '<img src="{}" style="max-height: 40px; max-width: 60px; object-fit: cover; border-radius: 4px;" />',
-                primary_image.image.url
+                variant_url(primary_image.image_variants) or primary_image.image.url
             )
         return "📷"
     thumbnail.short_description = "Foto"
@@ -111,12 +141,15 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_filter = ['is_primary', 'product__category']
     search_fields = ['product__name', 'alt_text']
     list_editable = ['is_primary', 'order']
+    list_select_related = ['product']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
     def image_preview(self, obj):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px; max-width: 80px; object-fit: cover; border-radius: 4px;" />',
-                obj.image.url
+                variant_url(obj.image_variants) or obj.image.url
             )
         return "Sin imagen"
     image_preview.short_description = "Imagen"
@@ -126,6 +159,7 @@ class ProductImageAdmin(admin.ModelAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'phone', 'city', 'department']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'phone']
+    list_select_related = ['user']
 
 
 @admin.register(Order)
@@ -144,7 +178,8 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['order_number', 'email', 'first_name', 'last_name', 'phone']
     readonly_fields = ['order_number', 'subtotal', 'shipping_cost', 'total', 'created_at', 'updated_at']
     list_per_page = 20
-    date_hierarchy = 'created_at'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     inlines = [OrderItemInline]
 
     fieldsets = (
@@ -180,6 +215,9 @@ class WishlistAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__email', 'product__name']
+    list_select_related = ['user', 'product']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(CartItem)
@@ -187,6 +225,9 @@ class CartItemAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'quantity', 'subtotal', 'updated_at']
     list_filter = ['updated_at']
     search_fields = ['user__email', 'product__name']
+    list_select_related = ['user', 'product']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 # Customize admin site
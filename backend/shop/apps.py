@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
-    verbose_name = 'Tienda Alma Artesana'
\ No newline at end of file
+    verbose_name = 'Tienda Alma Artesana'
+
+    def ready(self):
+        from . import signals  # noqa: F401
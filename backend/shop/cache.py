@@ -0,0 +1,63 @@
+"""
+Versioned caching for catalog reads.
+
+Every cached catalog payload is keyed by a global catalog version. Product,
+ProductImage and Category writes bump the version (see signals.py), so stale
+entries are never read again and simply expire.
+
+The version lives in the database (CatalogVersion), not in the cache: a
+LocMem cache is per process, and a bump seen by one worker only would leave
+the others serving stale payloads and answering 304 for them.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CATALOG_VERSION_PK = 1
+
+
+def catalog_version(request=None):
+    """Current version, read once per request when one is given"""
+    from .models import CatalogVersion
+
+    request = getattr(request, '_request', request)
+    version = getattr(request, '_catalog_version', None)
+    if version is None:
+        version = CatalogVersion.objects.filter(
+            pk=CATALOG_VERSION_PK
+        ).values_list('version', flat=True).first()
+        if version is None:
+            # Time-based so a recreated row never reuses an old number
+            version = CatalogVersion.objects.get_or_create(
+                pk=CATALOG_VERSION_PK,
+                defaults={'version': time.time_ns()}
+            )[0].version
+        if request is not None:
+            request._catalog_version = version
+    return version
+
+
+def bump_catalog_version():
+    from .models import CatalogVersion
+
+    if not CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(version=time.time_ns()):
+        catalog_version()
+
+
+def catalog_cache_key(name, request):
+    """Key for a catalog payload; the full URI covers host, scheme and filters"""
+    uri = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'shop:catalog:{name}:{catalog_version(request)}:{uri}'
+
+
+def get_or_set_catalog(name, request, build):
+    """Return the cached payload for this request, building it on a miss"""
+    key = catalog_cache_key(name, request)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,153 @@
+"""
+Full-catalog product feeds for marketplaces and ad platforms.
+
+Every active product is read from a server-side cursor in chunks and written
+as NDJSON, CSV or a Google Merchant style RSS/XML feed, one line at a time,
+optionally gzip-compressed on the fly. Used by /api/feeds/products.<format>
+and `manage.py export_product_feed`.
+"""
+import csv
+import io
+import json
+import zlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+from .models import Product
+from .streaming import iter_chunks
+
+
+FEED_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'xml': 'application/xml',
+}
+
+FEED_COLUMNS = [
+    'id', 'sku', 'title', 'description', 'link', 'image_link',
+    'price', 'original_price', 'currency', 'stock', 'availability',
+    'category', 'brand',
+]
+
+CURRENCY = 'GTQ'
+BRAND = 'Alma Artesana'
+
+
+def feed_rows(base_url):
+    """One dict per active product; base_url makes image URLs absolute"""
+    base_url = (settings.MEDIA_BASE_URL or base_url).rstrip('/')
+    products = Product.objects.filter(is_active=True).select_related(
+        'category', 'primary_image'
+    ).order_by('pk')
+    for chunk in iter_chunks(products):
+        for product in chunk:
+            image = product.primary_image
+            on_sale = product.original_price and product.original_price > product.price
+            yield {
+                'id': product.pk,
+                'sku': product.sku or '',
+                'title': product.name,
+                'description': product.short_description or product.description,
+                'link': f'{settings.FRONTEND_URL}/producto/{product.slug}',
+                'image_link': f'{base_url}{image.image.url}' if image else '',
+                'price': str(product.price),
+                'original_price': str(product.original_price) if on_sale else '',
+                'currency': CURRENCY,
+                'stock': product.stock,
+                'availability': 'in stock' if product.in_stock else 'out of stock',
+                'category': product.category.name,
+                'brand': BRAND,
+            }
+
+
+# =====================================================
+# WRITERS
+# =====================================================
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FEED_COLUMNS)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for row in rows:
+        writer.writerow(row)
+        yield flush()
+
+
+def xml_lines(rows):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+        '<channel>\n'
+        f'<title>{BRAND}</title>\n'
+        f'<link>{escape(settings.FRONTEND_URL)}</link>\n'
+    )
+    for row in rows:
+        # Merchant feeds put the regular price in g:price and the deal in g:sale_price
+        prices = (
+            f'<g:price>{row["original_price"]} {CURRENCY}</g:price>'
+            f'<g:sale_price>{row["price"]} {CURRENCY}</g:sale_price>'
+            if row['original_price'] else
+            f'<g:price>{row["price"]} {CURRENCY}</g:price>'
+        )
+        yield (
+            '<item>'
+            f'<g:id>{row["id"]}</g:id>'
+            f'<g:mpn>{escape(row["sku"])}</g:mpn>'
+            f'<g:title>{escape(row["title"])}</g:title>'
+            f'<g:description>{escape(row["description"])}</g:description>'
+            f'<g:link>{escape(row["link"])}</g:link>'
+            f'<g:image_link>{escape(row["image_link"])}</g:image_link>'
+            f'{prices}'
+            f'<g:availability>{row["availability"]}</g:availability>'
+            f'<g:quantity>{row["stock"]}</g:quantity>'
+            f'<g:product_type>{escape(row["category"])}</g:product_type>'
+            f'<g:brand>{BRAND}</g:brand>'
+            '<g:condition>new</g:condition>'
+            '</item>\n'
+        )
+    yield '</channel>\n</rss>\n'
+
+
+WRITERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+    'xml': xml_lines,
+}
+
+
+def feed_stream(feed_format, base_url, compress=False):
+    """Bytes of the whole feed, produced incrementally"""
+    chunks = (
+        line.encode('utf-8')
+        for line in WRITERS[feed_format](feed_rows(base_url))
+    )
+    return gzip_stream(chunks) if compress else chunks
+
+
+def gzip_stream(chunks, flush_every=64 * 1024):
+    """Gzip an iterable of bytes on the fly, emitting roughly every flush_every bytes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_every:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
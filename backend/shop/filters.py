@@ -0,0 +1,23 @@
+"""
+Ordering for product listings.
+
+Every ordering ends in a pk tiebreaker, so products with equal values
+(e.g. all at popularity 0) come out in the same order on every page, from
+the database and from the in-process snapshot alike. The tiebreaker runs
+in the direction of the last field, matching the id column that ends each
+ordering index, so both ?ordering=x and ?ordering=-x read an index in order.
+"""
+from rest_framework.filters import OrderingFilter
+
+
+def with_tiebreaker(ordering):
+    ordering = list(ordering)
+    if ordering and not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+        ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+    return ordering
+
+
+class ProductOrderingFilter(OrderingFilter):
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        return with_tiebreaker(ordering) if ordering else ordering
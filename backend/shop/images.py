@@ -0,0 +1,232 @@
+"""
+Responsive image variants for ProductImage and Category images.
+
+Each upload is resized once into VARIANT_SIZES (bounding boxes, never
+upscaled) and encoded as AVIF, WebP and JPEG next to the original:
+
+    variants/<original path without extension>/<size>.<format>
+
+The Pillow work runs in a process pool after the save commits, so admin
+uploads return immediately; the result is recorded on the row's
+image_variants field and exposed by the serializers as srcset strings,
+together with the intrinsic size and a tiny inline placeholder.
+"""
+import base64
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'variants'
+
+# Longest side in pixels, smallest first
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 1024,
+    'zoom': 2048,
+}
+
+# Longest side of the inline placeholder
+PLACEHOLDER_SIZE = 16
+
+# Best first: srcset maps keep this order for <picture> sources
+VARIANT_FORMATS = {
+    'avif': {'format': 'AVIF', 'quality': 55, 'speed': 6},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def available_formats():
+    # AVIF needs a Pillow built with libavif
+    return [fmt for fmt in VARIANT_FORMATS if features.check(fmt.replace('jpeg', 'jpg'))]
+
+
+def variant_name(source, size, fmt):
+    stem = os.path.splitext(source)[0]
+    return f'{VARIANT_DIR}/{stem}/{size}.{fmt}'
+
+
+def build_variants(source):
+    """
+    Resize and encode every variant of a stored image (runs in a worker
+    process). Returns the image_variants value for the row.
+    """
+    original = open_source(source)
+    longest = max(original.size)
+    formats = available_formats()
+    sizes = {}
+    for size, box in VARIANT_SIZES.items():
+        # Never upscale; the smallest variant is always written
+        if sizes and box > longest:
+            break
+        image = original.copy()
+        image.thumbnail((box, box), Image.LANCZOS)
+        for fmt in formats:
+            name = variant_name(source, size, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(encode(image, fmt)))
+        sizes[size] = list(image.size)
+    return {
+        'source': source, 'formats': formats, 'sizes': sizes,
+        **placeholder_info(original),
+    }
+
+
+def build_placeholder(source):
+    """Only the placeholder_info keys, for backfilling rows without them"""
+    return placeholder_info(open_source(source))
+
+
+def open_source(source):
+    with default_storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    return image
+
+
+def placeholder_info(image):
+    """
+    Intrinsic size plus a PLACEHOLDER_SIZE px WebP data URI (a few hundred
+    bytes), so clients can reserve layout and paint a blurred preview
+    before the real image arrives
+    """
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+    data = base64.b64encode(encode(tiny, 'webp', quality=40)).decode()
+    return {
+        'width': image.width,
+        'height': image.height,
+        'placeholder': f'data:image/webp;base64,{data}',
+    }
+
+
+def encode(image, fmt, **options):
+    """Bytes of image in one of VARIANT_FORMATS, flattening alpha for JPEG"""
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, 'white')
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, **{**VARIANT_FORMATS[fmt], **options})
+    return buffer.getvalue()
+
+
+def image_info(variants):
+    """(width, height, placeholder) recorded for an image, Nones until built"""
+    if not variants or 'placeholder' not in variants:
+        return None, None, None
+    return variants['width'], variants['height'], variants['placeholder']
+
+
+def variants_current(variants, field_file):
+    return bool(variants) and variants.get('source') == field_file.name
+
+
+def variant_url(variants, size='thumb', fmt='jpeg'):
+    """Storage URL of one variant, None when it was not generated"""
+    if not variants or fmt not in variants['formats'] or size not in variants['sizes']:
+        return None
+    return default_storage.url(variant_name(variants['source'], size, fmt))
+
+
+def srcset(variants, absolute_url):
+    """{format: 'url 160w, url 480w, ...'} for <picture>/<img srcset>"""
+    if not variants:
+        return None
+    return {
+        fmt: ', '.join(
+            '{} {}w'.format(
+                absolute_url(default_storage.url(variant_name(variants['source'], size, fmt))),
+                width
+            )
+            for size, (width, height) in variants['sizes'].items()
+        )
+        for fmt in variants['formats']
+    }
+
+
+# =====================================================
+# PROCESS POOL
+# =====================================================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+        return _executor
+
+
+# Builds in flight by source name, shared by rows saved with the same file
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def generate_variants(instance):
+    """
+    Build variants for instance.image (ProductImage or Category) in the pool
+    and record them on the row when done
+    """
+    model, pk, source = type(instance), instance.pk, instance.image.name
+    if not source:
+        return None
+    built = model.objects.filter(
+        image=source,
+        image_variants__source=source
+    ).values_list('image_variants', flat=True).first()
+    if built:
+        store_variants(model, pk, source, built)
+        return None
+
+    with _pending_lock:
+        future = _pending.get(source)
+        if future is None:
+            future = _pending[source] = executor().submit(build_variants, source)
+            future.add_done_callback(lambda done: _pending.pop(source, None))
+    future.add_done_callback(lambda done: store_from_pool(model, pk, source, done))
+    return future
+
+
+def store_from_pool(model, pk, source, future):
+    # Runs on the pool's callback thread, which gets its own DB connection
+    try:
+        store_variants(model, pk, source, future.result())
+    except Exception:
+        logger.exception('Image variants failed for %s', source)
+    finally:
+        connections.close_all()
+
+
+def store_variants(model, pk, source, variants):
+    from .cache import bump_catalog_version
+    from .models import Product, ProductImage
+
+    # Skipped if the image was replaced in the meantime
+    if not model.objects.filter(pk=pk, image=source).update(image_variants=variants):
+        return
+    if model is ProductImage:
+        # Touch the product so incremental readers (snapshot) reload it
+        Product.objects.filter(images__pk=pk).update()
+    else:
+        model.objects.filter(pk=pk).update(updated_at=timezone.now())
+        bump_catalog_version()
@@ -0,0 +1,43 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from shop.images import (
+    build_placeholder, build_variants, executor, image_info, store_variants, variants_current
+)
+from shop.models import Category, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Fill intrinsic size and inline placeholder for images that lack them, in parallel'
+
+    def handle(self, *args, **options):
+        # One job per stored file, shared by every row that points at it
+        rows = {}
+        for model in (ProductImage, Category):
+            for instance in model.objects.exclude(image='').only('pk', 'image', 'image_variants'):
+                if image_info(instance.image_variants)[2] is None:
+                    current = variants_current(instance.image_variants, instance.image)
+                    rows.setdefault(instance.image.name, []).append(
+                        (model, instance.pk, instance.image_variants if current else None)
+                    )
+
+        pending = {}
+        for source, targets in rows.items():
+            # Rows without variants get the full build, which includes the placeholder
+            build = build_placeholder if all(variants for _, _, variants in targets) else build_variants
+            pending[executor().submit(build, source)] = source
+
+        filled = failed = 0
+        for future in as_completed(pending):
+            source = pending[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{source}: {error}')
+                continue
+            for model, pk, variants in rows[source]:
+                store_variants(model, pk, source, {**(variants or {}), **result})
+                filled += 1
+        self.stdout.write(self.style.SUCCESS(f'Filled {filled} images ({failed} failed)'))
@@ -0,0 +1,104 @@
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from shop.management.seeding import api_request, rolled_back
+from shop.models import Category, Order, OrderItem, Product, ProductImage
+from shop.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from shop.serializers import OrderSerializer, ProductDetailSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare DRF JSONRenderer with FastJSONRenderer and MessagePackRenderer '
+        'on ProductDetailSerializer and OrderSerializer payloads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000)
+        parser.add_argument('--items', type=int, default=12, help='Images / order items per payload')
+
+    def handle(self, *args, **options):
+        payloads = self.build_payloads(options['items'])
+
+        renderers = [('JSONRenderer (stdlib json)', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('FastJSONRenderer (orjson)', FastJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+
+        number = options['number']
+        for name, data in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({number} renders)'))
+            baseline = None
+            for label, renderer in renderers:
+                seconds = min(timeit.repeat(
+                    lambda: renderer.render(data), number=number, repeat=3
+                ))
+                size = len(renderer.render(data))
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f'  {label:<28} {seconds / number * 1e6:8.1f} µs/render  '
+                    f'{size:6d} bytes  x{baseline / seconds:.2f}'
+                )
+
+    def build_payloads(self, items):
+        """Serialize a realistic product and order inside a rolled-back transaction"""
+        request = api_request('/api/')
+        context = {'request': request}
+        payloads = {}
+        with rolled_back():
+            category = Category.objects.create(
+                name='Macramé', slug='benchmark-macrame',
+                description='Tejidos a mano con hilo de algodón'
+            )
+            product = Product.objects.create(
+                name='Colgante de macramé «Luna»',
+                slug='benchmark-colgante',
+                description='Colgante tejido a mano en Antigua Guatemala. ' * 10,
+                short_description='Colgante artesanal de algodón',
+                price=Decimal('249.99'),
+                original_price=Decimal('299.00'),
+                category=category,
+                badge='handmade',
+                stock=7,
+                sku='BENCH-0001',
+                artisan_name='María Tzul',
+                origin='Chichicastenango',
+                materials='Algodón orgánico, tintes naturales',
+                dimensions='30cm x 90cm',
+                weight=Decimal('0.45'),
+            )
+            for index in range(items):
+                ProductImage.objects.create(
+                    product=product,
+                    image=f'products/benchmark_{index}.png',
+                    alt_text=f'Colgante vista {index}',
+                    is_primary=index == 0,
+                    order=index,
+                )
+            order = Order.objects.create(
+                email='cliente@example.com', phone='+502 5555 5555',
+                first_name='Ana', last_name='López',
+                address='4a Avenida 12-34, Zona 1', city='Guatemala',
+                department='Guatemala', postal_code='01001',
+                subtotal=Decimal('2999.88'), shipping_cost=Decimal('0'),
+                total=Decimal('2999.88'), notes='Entregar por la tarde',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product=product,
+                    product_name=f'{product.name} #{index}',
+                    product_price=product.price, quantity=index + 1,
+                )
+                for index in range(items)
+            ])
+            payloads['ProductDetailSerializer'] = ProductDetailSerializer(
+                Product.objects.get(pk=product.pk), context=context
+            ).data
+            payloads['OrderSerializer'] = OrderSerializer(
+                Order.objects.get(pk=order.pk), context=context
+            ).data
+        return payloads
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop.recommendations import RELATED_TOP_K, build_related_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "customers also bought" neighbours from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=RELATED_TOP_K)
+
+    def handle(self, *args, **options):
+        stored = build_related_products(options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} related products'))
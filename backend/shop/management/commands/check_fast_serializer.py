@@ -0,0 +1,128 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from shop.management.seeding import api_request, rolled_back
+from shop.models import Category, Product, ProductImage
+from shop.serializers import FastProductListSerializer, ProductListSerializer
+
+
+# (price, original_price, expected discount_percentage): no discount, an
+# original at or below the price, and discounts where float math and
+# integer cents can disagree on int()
+PRICE_CASES = [
+    ('100.00', None, 0),
+    ('100.00', '80.00', 0),
+    ('100.00', '100.00', 0),
+    ('249.99', '299.00', 16),
+    ('2.01', '3.00', 33),
+    ('0.01', '0.03', 66),
+    ('9.99', '19.99', 50),
+    ('9.99', '10.00', 0),
+]
+
+# Primary image variants; None means no image at all
+IMAGE_CASES = [
+    None,
+    {},
+    {
+        'source': 'products/check-fast.png',
+        'formats': ['webp', 'jpeg'],
+        'sizes': {'thumb': [160, 120], 'card': [480, 360]},
+        'width': 640,
+        'height': 480,
+        'placeholder': 'data:image/webp;base64,UklGRg==',
+    },
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed pricing and image edge cases inside a rolled-back transaction and '
+        'check that FastProductListSerializer renders them, and every existing '
+        'product, byte for byte like ProductListSerializer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            cases = self.seed()
+            total, errors = self.compare(options['batch_size'], cases)
+
+        for error in errors:
+            self.stderr.write(error)
+        if errors:
+            raise CommandError(f'{len(errors)} of {total} products differ or are wrong')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} products render identically ({len(cases)} seeded edge cases)'
+        ))
+
+    def seed(self):
+        """{product id: (expected discount, expected image variants)}"""
+        category = Category.objects.create(name='Check fast', slug='check-fast-serializer')
+        cases = {}
+        for i, (price, original_price, discount) in enumerate(PRICE_CASES):
+            for j, variants in enumerate(IMAGE_CASES):
+                product = Product.objects.create(
+                    name=f'Check fast {i}-{j}',
+                    slug=f'check-fast-{i}-{j}',
+                    description='Caso de prueba',
+                    price=price,
+                    original_price=original_price,
+                    category=category,
+                    stock=j,
+                )
+                if variants is not None:
+                    # Signals set primary_image; variant builds run on commit, never here
+                    ProductImage.objects.create(
+                        product=product,
+                        image='products/check-fast.png',
+                        image_variants=variants,
+                        is_primary=True,
+                    )
+                cases[product.pk] = (discount, variants)
+        return cases
+
+    def compare(self, batch_size, cases):
+        request = api_request('/api/products/')
+        context = {'request': request}
+        renderer = JSONRenderer()
+
+        queryset = Product.objects.select_related(
+            'category', 'primary_image'
+        ).order_by('pk')
+        errors = []
+        total = queryset.count()
+        for start in range(0, total, batch_size):
+            batch = queryset[start:start + batch_size]
+            expected = ProductListSerializer(batch, many=True, context=context).data
+            actual = FastProductListSerializer(
+                FastProductListSerializer.values(batch), context=context
+            ).data
+            if len(expected) != len(actual):
+                raise CommandError('Fast serializer returned a different number of rows')
+            for old, new in zip(expected, actual):
+                old_bytes, new_bytes = renderer.render(old), renderer.render(new)
+                if old_bytes != new_bytes:
+                    errors.append(f'Product {old["id"]}:\n  {old_bytes}\n  {new_bytes}')
+                if old['id'] in cases:
+                    errors.extend(self.check_case(new, *cases[old['id']]))
+        return total, errors
+
+    def check_case(self, data, discount, variants):
+        """Assertions on a seeded product, so both serializers can't be wrong alike"""
+        name = data['name']
+        if data['discount_percentage'] != discount:
+            yield f'{name}: discount_percentage {data["discount_percentage"]}, expected {discount}'
+        if data['in_stock'] != (data['stock'] > 0):
+            yield f'{name}: in_stock {data["in_stock"]} with stock {data["stock"]}'
+        if (data['primary_image'] is None) != (variants is None):
+            yield f'{name}: primary_image {data["primary_image"]!r}'
+        if (data['primary_image_srcset'] is None) != (not variants):
+            yield f'{name}: primary_image_srcset {data["primary_image_srcset"]!r}'
+        expected_size = (variants['width'], variants['height']) if variants else (None, None)
+        if (data['primary_image_width'], data['primary_image_height']) != expected_size:
+            yield f'{name}: size {data["primary_image_width"]}x{data["primary_image_height"]}'
+        if data['primary_image_placeholder'] != (variants['placeholder'] if variants else None):
+            yield f'{name}: primary_image_placeholder {data["primary_image_placeholder"]!r}'
@@ -0,0 +1,141 @@
+import itertools
+import random
+import re
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.filters import ProductOrderingFilter
+from shop.management.seeding import api_request, rolled_back
+from shop.models import Category, Product
+from shop.search import rebuild_search_index
+from shop.views import ProductViewSet
+
+
+# Every ProductViewSet filter, combined with every ordering
+FILTERS = {
+    'category': 'plan-check-cat-3',
+    'badge': 'sale',
+    'min_price': '150',
+    'max_price': '300',
+    'in_stock': 'true',
+    'featured': 'true',
+}
+ORDERINGS = [
+    None, 'price', '-price', 'name', '-name', 'created_at', '-created_at',
+    'popularity', '-popularity',
+]
+
+# Searches matching every seeded product and a small share of them
+SEARCHES = ['producto', 'producto 123']
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on shop_product\b'),
+    # SQLite may drive a full product read from the category table instead
+    'sqlite': re.compile(r'SCAN shop_(product|category)\b(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large catalog inside a rolled-back transaction and EXPLAIN every '
+        'ProductViewSet filter/ordering combination, failing on sequential scans '
+        'and on slow ranked searches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--max-search-ms', type=float, default=1000)
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Unsupported database backend: {connection.vendor}')
+
+        failures = []
+        with rolled_back():
+            self.seed(options['products'], options['categories'])
+            for params in self.combinations():
+                plan = self.explain(params)
+                if options['verbose_plans']:
+                    self.stdout.write(f'{params}\n{plan}\n')
+                if pattern.search(plan):
+                    failures.append((params, plan))
+            searches = self.time_searches()
+
+        total = len(list(self.combinations()))
+        for params, plan in failures:
+            self.stderr.write(f'Sequential scan for {params}:\n{plan}\n')
+        slow = [(search, ms) for search, ms in searches if ms > options['max_search_ms']]
+        for search, ms in slow:
+            self.stderr.write(f'Search {search!r} took {ms:.0f} ms')
+        if failures:
+            raise CommandError(f'{len(failures)} of {total} query plans use a sequential scan')
+        if slow:
+            raise CommandError(
+                f'{len(slow)} of {len(searches)} searches slower than {options["max_search_ms"]:.0f} ms'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} query plans checked, no sequential scans; '
+            f'{len(searches)} searches under {options["max_search_ms"]:.0f} ms'
+        ))
+
+    def seed(self, products, categories):
+        rng = random.Random(0)
+        category_objs = Category.objects.bulk_create([
+            Category(name=f'Cat {i}', slug=f'plan-check-cat-{i}', order=i)
+            for i in range(categories)
+        ])
+        badges = [code for code, label in Product.BADGE_CHOICES]
+        Product.objects.bulk_create((
+            Product(
+                name=f'Producto {i}',
+                slug=f'plan-check-{i}',
+                description='Producto artesanal',
+                price=Decimal(rng.randint(1000, 100000)) / 100,
+                category=rng.choice(category_objs),
+                badge=rng.choice(badges),
+                stock=rng.choice([0, 0, 1, 5, 20]),
+                is_active=rng.random() > 0.1,
+                is_featured=rng.random() < 0.05,
+            )
+            for i in range(products)
+        ), batch_size=2000)
+        rebuild_search_index()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def combinations(self):
+        for size in range(len(FILTERS) + 1):
+            for keys in itertools.combinations(FILTERS, size):
+                for ordering in ORDERINGS:
+                    params = {key: FILTERS[key] for key in keys}
+                    if ordering:
+                        params['ordering'] = ordering
+                    yield params
+
+    def first_page(self, params):
+        """The first page queryset exactly as ProductViewSet.list builds it"""
+        view = ProductViewSet(action='list', format_kwarg=None)
+        view.request = api_request('/api/products/', params)
+        queryset = ProductOrderingFilter().filter_queryset(
+            view.request, view.get_queryset(), view
+        )
+        return queryset[:12]
+
+    def explain(self, params):
+        return self.first_page(params).explain()
+
+    def time_searches(self):
+        """[(search, milliseconds)] to rank and fetch the first page"""
+        timings = []
+        for search in SEARCHES:
+            queryset = self.first_page({'search': search})
+            start = time.perf_counter()
+            list(queryset)
+            timings.append((search, (time.perf_counter() - start) * 1000))
+        return timings
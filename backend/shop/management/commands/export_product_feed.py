@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from shop.feeds import FEED_FORMATS, feed_stream
+
+
+class Command(BaseCommand):
+    help = 'Write the product feed (ndjson, csv or xml) to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FEED_FORMATS), default='ndjson')
+        parser.add_argument(
+            '--base-url', default='http://localhost:8000',
+            help='Prefix for image URLs'
+        )
+        parser.add_argument('--output', help='File path (default: stdout)')
+        parser.add_argument('--gzip', action='store_true')
+
+    def handle(self, *args, **options):
+        chunks = feed_stream(options['format'], options['base_url'], options['gzip'])
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {options["output"]}'))
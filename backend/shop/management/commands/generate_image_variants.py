@@ -0,0 +1,39 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from shop.images import build_variants, executor, store_variants, variants_current
+from shop.models import Category, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Build missing responsive image variants for product and category images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild existing variants too')
+
+    def handle(self, *args, **options):
+        # One build per stored file, shared by every row that points at it
+        rows = {}
+        for model in (ProductImage, Category):
+            for instance in model.objects.exclude(image='').only('pk', 'image', 'image_variants'):
+                if options['force'] or not variants_current(instance.image_variants, instance.image):
+                    rows.setdefault(instance.image.name, []).append((model, instance.pk))
+
+        pending = {
+            executor().submit(build_variants, source): source
+            for source in rows
+        }
+        built = failed = 0
+        for future in as_completed(pending):
+            source = pending[future]
+            try:
+                variants = future.result()
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{source}: {error}')
+                continue
+            for model, pk in rows[source]:
+                store_variants(model, pk, source, variants)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built variants for {built} files ({failed} failed)'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from shop.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached active product count on every category'
+
+    def handle(self, *args, **options):
+        updated = Category.refresh_product_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculated product counts for {updated} categories'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from shop.cache import bump_catalog_version
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute product popularity from recent sales and wishlist adds. '
+        'Run daily so older sales decay out of the score.'
+    )
+
+    def handle(self, *args, **options):
+        updated = Product.refresh_popularity()
+        if updated:
+            # Popularity writes keep the version; move it once so cached
+            # ?ordering=popularity responses and the snapshot catch up
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Updated popularity of {updated} products'))
@@ -0,0 +1,33 @@
+"""
+Helpers for management commands that seed data to check or benchmark against.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        # on_commit callbacks registered inside are discarded as well
+        transaction.set_rollback(True)
+
+
+def _server_name():
+    # APIRequestFactory defaults to 'testserver', which ALLOWED_HOSTS rejects
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+def api_request(path, params=None):
+    """DRF GET request as a view would receive it, for serializer contexts"""
+    factory = APIRequestFactory(SERVER_NAME=_server_name())
+    return Request(factory.get(path, params))
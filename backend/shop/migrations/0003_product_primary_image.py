@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_primary_image(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    ProductImage = apps.get_model('shop', 'ProductImage')
+    for product in Product.objects.all():
+        primary = ProductImage.objects.filter(product=product).order_by(
+            '-is_primary', 'order', 'pk'
+        ).first()
+        if primary:
+            Product.objects.filter(pk=product.pk).update(primary_image=primary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_order_userprofile_orderitem_wishlist_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shop.productimage', verbose_name='Imagen principal'),
+        ),
+        migrations.RunPython(backfill_primary_image, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:08
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_count(apps, schema_editor):
+    Category = apps.get_model('shop', 'Category')
+    Product = apps.get_model('shop', 'Product')
+    active_count = Product.objects.filter(
+        category=models.OuterRef('pk'),
+        is_active=True
+    ).order_by().values('category').annotate(
+        count=models.Count('pk')
+    ).values('count')
+    Category.objects.update(
+        product_count=Coalesce(models.Subquery(active_count), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_product_primary_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Productos activos'),
+        ),
+        migrations.RunPython(backfill_product_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:09
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_COLUMNS = ['name', 'short_description', 'artisan_name', 'materials', 'description']
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('spanish', unaccent(coalesce(name, ''))), 'A') || "
+    "setweight(to_tsvector('spanish', unaccent(coalesce(short_description, ''))), 'B') || "
+    "setweight(to_tsvector('spanish', unaccent(coalesce(artisan_name, ''))), 'B') || "
+    "setweight(to_tsvector('spanish', unaccent(coalesce(materials, ''))), 'B') || "
+    "setweight(to_tsvector('spanish', unaccent(coalesce(description, ''))), 'C')"
+)
+
+
+def create_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS shop_product_search_gin '
+            'ON shop_product USING gin (search_vector)'
+        )
+        schema_editor.execute(f'UPDATE shop_product SET search_vector = {POSTGRES_VECTOR}')
+    elif vendor == 'sqlite':
+        columns = ', '.join(SEARCH_COLUMNS)
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5('
+            f"{columns}, tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Same column weighting as the PostgreSQL A/B/C weights
+        schema_editor.execute(
+            "INSERT INTO shop_product_fts (shop_product_fts, rank) "
+            "VALUES ('rank', 'bm25(10.0, 4.0, 4.0, 4.0, 1.0)')"
+        )
+        values = ', '.join(f"COALESCE({column}, '')" for column in SEARCH_COLUMNS)
+        schema_editor.execute(
+            f'INSERT INTO shop_product_fts (rowid, {columns}) '
+            f'SELECT id, {values} FROM shop_product'
+        )
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS shop_product_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS shop_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_category_product_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # GIN index / FTS5 table are backend specific, so not in Meta.indexes
+        migrations.RunPython(create_search_backend, drop_search_backend),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:22
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+
+def backfill_popularity(apps, schema_editor):
+    # Same score as Product.popularity_expression at the time of writing
+    Product = apps.get_model('shop', 'Product')
+    OrderItem = apps.get_model('shop', 'OrderItem')
+    Wishlist = apps.get_model('shop', 'Wishlist')
+    now = timezone.now()
+    weight = sum(
+        models.Case(
+            models.When(order__created_at__gte=now - timedelta(days=days), then=models.Value(weight)),
+            default=models.Value(0),
+            output_field=models.IntegerField()
+        )
+        for days, weight in [(7, 4), (30, 2), (90, 1)]
+    )
+    sales = OrderItem.objects.filter(
+        product=models.OuterRef('pk'),
+        order__created_at__gte=now - timedelta(days=90)
+    ).exclude(
+        order__status='cancelled'
+    ).order_by().values('product').annotate(
+        score=models.Sum(models.F('quantity') * weight)
+    ).values('score')
+    wishes = Wishlist.objects.filter(
+        product=models.OuterRef('pk'),
+        created_at__gte=now - timedelta(days=90)
+    ).order_by().values('product').annotate(
+        count=models.Count('pk')
+    ).values('count')
+    Product.objects.update(
+        popularity=Cast(
+            Coalesce(models.Subquery(sales), 0), models.FloatField()
+        ) + Cast(
+            Coalesce(models.Subquery(wishes), 0), models.FloatField()
+        ) * 0.5
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_related_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Popularidad'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-popularity', '-id'], name='product_active_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:29
+
+from django.db import migrations, models
+import shop.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=shop.storage.hashed_storage, upload_to='categories/', verbose_name='Imagen'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=shop.storage.hashed_storage, upload_to='products/', verbose_name='Imagen'),
+        ),
+    ]
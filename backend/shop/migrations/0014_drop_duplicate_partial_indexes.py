@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_product_ordering_tiebreaker_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_default_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_badge_idx',
+        ),
+    ]
@@ -1,10 +1,18 @@
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+from datetime import timedelta
 from decimal import Decimal
 import uuid
 
+from .cache import bump_catalog_version
+from .storage import hashed_storage
+
 
 class UserProfile(models.Model):
     """Extended user profile"""
@@ -41,9 +49,12 @@ class Category(models.Model):
     image = models.ImageField(
         'Imagen',
         upload_to='categories/',
+        storage=hashed_storage,
         blank=True,
         null=True
     )
+    # Resized copies of image, see shop/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     icon = models.CharField(
         'Icono (emoji o código)',
         max_length=50,
@@ -52,6 +63,12 @@ class Category(models.Model):
     )
     is_active = models.BooleanField('Activa', default=True)
     order = models.PositiveIntegerField('Orden', default=0)
+    # Maintained by Product signals / ProductQuerySet.update, see refresh_product_counts
+    product_count = models.PositiveIntegerField(
+        'Productos activos',
+        default=0,
+        editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -66,11 +83,64 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # product_count is only written by refresh_product_counts; a
+            # stale in-memory value must not overwrite a concurrent recount
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'product_count'
+            ]
         super().save(*args, **kwargs)
 
-    @property
-    def product_count(self):
-        return self.products.filter(is_active=True).count()
+    @classmethod
+    def refresh_product_counts(cls, category_ids=None):
+        """Recompute product_count from the products table in a single UPDATE"""
+        active_count = Product.objects.filter(
+            category=models.OuterRef('pk'),
+            is_active=True
+        ).order_by().values('category').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        categories = cls.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+        return categories.update(
+            product_count=Coalesce(models.Subquery(active_count), 0)
+        )
+
+
+class ProductQuerySet(models.QuerySet):
+    """Keeps Category.product_count and catalog caches correct across bulk updates"""
+
+    COUNTER_FIELDS = {'is_active', 'category', 'category_id'}
+
+    def update(self, **kwargs):
+        # Like auto_now on save(); incremental readers rely on updated_at
+        kwargs.setdefault('updated_at', timezone.now())
+        if not self.COUNTER_FIELDS.intersection(kwargs):
+            rows = super().update(**kwargs)
+            # In autocommit on_commit runs at once: register after the UPDATE
+            transaction.on_commit(bump_catalog_version)
+            return rows
+        category_ids = set(
+            self.order_by().values_list('category_id', flat=True).distinct()
+        )
+        rows = super().update(**kwargs)
+        transaction.on_commit(bump_catalog_version)
+        new_category = kwargs.get('category', kwargs.get('category_id'))
+        if new_category is not None:
+            category_ids.add(getattr(new_category, 'pk', new_category))
+        transaction.on_commit(
+            lambda: Category.refresh_product_counts(category_ids)
+        )
+        return rows
+
+    def update_unversioned(self, **kwargs):
+        """
+        Plain UPDATE for columns no payload shows (popularity): leaves
+        updated_at and the catalog version alone, so caches and ETags hold
+        """
+        return super().update(**kwargs)
 
 
 class Product(models.Model):
@@ -85,6 +155,18 @@ class Product(models.Model):
         ('handmade', '100% Artesanal'),
     ]
 
+    # Units sold count once per window they fall in: a sale this week
+    # weighs 4 + 2 + 1, one from two months ago weighs 1
+    POPULARITY_WINDOWS = [
+        (timedelta(days=7), 4),
+        (timedelta(days=30), 2),
+        (timedelta(days=90), 1),
+    ]
+    # Per wishlist add within the widest window
+    WISHLIST_WEIGHT = 0.5
+    # Products badged automatically with settings.AUTO_BESTSELLER_BADGE
+    BESTSELLER_COUNT = 12
+
     # Basic info
     name = models.CharField('Nombre', max_length=200)
     slug = models.SlugField(unique=True, blank=True)
@@ -141,6 +223,17 @@ class Product(models.Model):
     is_active = models.BooleanField('Activo', default=True)
     is_featured = models.BooleanField('Destacado', default=False)
 
+    # Denormalized from ProductImage so listings avoid per-row image queries
+    primary_image = models.ForeignKey(
+        'ProductImage',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Imagen principal'
+    )
+
     # Artisan info
     artisan_name = models.CharField(
         'Nombre del artesano',
@@ -175,14 +268,65 @@ class Product(models.Model):
         null=True
     )
 
+    # Full-text search (PostgreSQL only, GIN-indexed), see shop/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Recent sales and wishlist adds, see refresh_popularity
+    popularity = models.FloatField('Popularidad', default=0, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         ordering = ['-is_featured', '-created_at']
+        # Partial on is_active: the storefront never reads inactive rows.
+        # Plans are checked by `manage.py check_query_plans`.
+        indexes = [
+            # Ordering indexes end in id, the tiebreaker of shop/filters.py
+            models.Index(
+                fields=['category', '-is_featured', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='product_active_category_idx'
+            ),
+            # Price range filters and ?ordering=price
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_price_idx'
+            ),
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_name_idx'
+            ),
+            # new_arrivals and ?ordering=created_at
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_created_idx'
+            ),
+            # ?ordering=popularity and the bestseller badge
+            models.Index(
+                fields=['-popularity', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_popularity_idx'
+            ),
+            # Default ordering and badge filter, full so the admin changelist
+            # (every product) shares them; inactive rows are few to skip
+            models.Index(
+                fields=['-is_featured', '-created_at', '-id'],
+                name='product_default_idx'
+            ),
+            models.Index(
+                fields=['badge', '-is_featured', '-created_at'],
+                name='product_badge_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -192,6 +336,102 @@ class Product(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def popularity_expression(cls):
+        """Decayed sales volume plus wishlist adds, as a correlated subquery"""
+        now = timezone.now()
+        widest = max(window for window, weight in cls.POPULARITY_WINDOWS)
+        weight = sum(
+            models.Case(
+                models.When(order__created_at__gte=now - window, then=models.Value(weight)),
+                default=models.Value(0),
+                output_field=models.IntegerField()
+            )
+            for window, weight in cls.POPULARITY_WINDOWS
+        )
+        sales = OrderItem.objects.filter(
+            product=models.OuterRef('pk'),
+            order__created_at__gte=now - widest
+        ).exclude(
+            order__status='cancelled'
+        ).order_by().values('product').annotate(
+            score=models.Sum(models.F('quantity') * weight)
+        ).values('score')
+        wishes = Wishlist.objects.filter(
+            product=models.OuterRef('pk'),
+            created_at__gte=now - widest
+        ).order_by().values('product').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        return Cast(
+            Coalesce(models.Subquery(sales), 0), models.FloatField()
+        ) + Cast(
+            Coalesce(models.Subquery(wishes), 0), models.FloatField()
+        ) * cls.WISHLIST_WEIGHT
+
+    @classmethod
+    def refresh_popularity(cls, product_ids=None):
+        """
+        Recompute popularity, writing only the rows whose score moved.
+        Popularity is in no payload, so the write keeps updated_at and the
+        catalog version; only bestseller badge changes bump it.
+        """
+        products = cls.objects.all()
+        if product_ids is not None:
+            products = products.filter(pk__in=product_ids)
+        changed = list(
+            products.annotate(
+                score=cls.popularity_expression()
+            ).exclude(
+                popularity=models.F('score')
+            ).values_list('pk', flat=True)
+        )
+        rows = 0
+        if changed:
+            rows = cls.objects.filter(pk__in=changed).update_unversioned(
+                popularity=cls.popularity_expression()
+            )
+        if settings.AUTO_BESTSELLER_BADGE:
+            cls.refresh_bestsellers()
+        return rows
+
+    @classmethod
+    def refresh_bestsellers(cls):
+        """
+        Badge the most popular products; other badges are never overwritten.
+        Writes (and bumps the catalog version) only when the set changed.
+        """
+        candidates = cls.objects.filter(badge__in=['', 'bestseller'])
+        top = list(
+            candidates.filter(
+                is_active=True,
+                popularity__gt=0
+            ).order_by('-popularity', '-pk').values_list(
+                'pk', flat=True
+            )[:cls.BESTSELLER_COUNT]
+        )
+        dropped = list(
+            candidates.filter(badge='bestseller').exclude(pk__in=top).values_list('pk', flat=True)
+        )
+        added = list(
+            candidates.filter(pk__in=top, badge='').values_list('pk', flat=True)
+        )
+        if dropped:
+            cls.objects.filter(pk__in=dropped).update(badge='')
+        if added:
+            cls.objects.filter(pk__in=added).update(badge='bestseller')
+        return bool(dropped or added)
+
+    def refresh_primary_image(self):
+        """Recompute the denormalized primary image from the product images"""
+        # Meta ordering puts the primary image first, then by order
+        self.primary_image = self.images.order_by('-is_primary', 'order', 'pk').first()
+        self.updated_at = timezone.now()
+        Product.objects.filter(pk=self.pk).update(
+            primary_image=self.primary_image,
+            updated_at=self.updated_at
+        )
+
     @property
     def in_stock(self):
         return self.stock > 0
@@ -212,7 +452,9 @@ class ProductImage(models.Model):
         related_name='images',
         verbose_name='Producto'
     )
-    image = models.ImageField('Imagen', upload_to='products/')
+    image = models.ImageField('Imagen', upload_to='products/', storage=hashed_storage)
+    # Resized copies of image, see shop/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(
         'Texto alternativo',
         max_length=200,
@@ -333,6 +575,13 @@ class Order(models.Model):
         verbose_name = 'Orden'
         verbose_name_plural = 'Órdenes'
         ordering = ['-created_at']
+        # Admin changelist ordering and list_filter
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_idx'),
+            models.Index(fields=['is_paid', '-created_at'], name='order_paid_idx'),
+            models.Index(fields=['payment_method', '-created_at'], name='order_payment_idx'),
+        ]
 
     def __str__(self):
         return f"Orden #{self.order_number}"
@@ -393,6 +642,38 @@ class OrderItem(models.Model):
         return self.product_price * self.quantity
 
 
+class RelatedProduct(models.Model):
+    """Top co-purchased products per product, rebuilt offline (see recommendations.py)"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='related_products',
+        verbose_name='Producto'
+    )
+    related = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Producto relacionado'
+    )
+    score = models.FloatField('Similitud')
+    rank = models.PositiveSmallIntegerField('Posición')
+
+    class Meta:
+        verbose_name = 'Producto relacionado'
+        verbose_name_plural = 'Productos relacionados'
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'rank'],
+                name='related_product_rank_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score:.3f})"
+
+
 class Wishlist(models.Model):
     """User wishlist"""
     user = models.ForeignKey(
@@ -412,6 +693,9 @@ class Wishlist(models.Model):
         verbose_name_plural = 'Favoritos'
         unique_together = ['user', 'product']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='wishlist_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
@@ -419,6 +703,10 @@ class Wishlist(models.Model):
 
 class CartItem(models.Model):
     """Persistent cart for logged-in users"""
+    # Orders from this subtotal ship free
+    FREE_SHIPPING_FROM = Decimal('500')
+    SHIPPING_COST = Decimal('35')
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -436,10 +724,62 @@ class CartItem(models.Model):
         verbose_name = 'Item de carrito'
         verbose_name_plural = 'Items de carrito'
         unique_together = ['user', 'product']
+        indexes = [
+            models.Index(fields=['-updated_at'], name='cartitem_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.quantity}x {self.product.name}"
 
     @property
     def subtotal(self):
-        return self.product.price * self.quantity
\ No newline at end of file
+        return self.product.price * self.quantity
+
+    @classmethod
+    def add_quantity(cls, user, product_id, quantity):
+        """
+        Add quantity of a product to the user's cart in one statement:
+        inserts the line or increments it in place under the (user, product)
+        constraint, only for a quantity of at least 1, while the product is
+        active and the resulting quantity fits its stock. Concurrent adds serialize on the row.
+        Returns the line's pk, None when nothing was written.
+        """
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table}
+                    (user_id, product_id, quantity, created_at, updated_at)
+                SELECT %s, product.id, %s, %s, %s
+                FROM {Product._meta.db_table} AS product
+                WHERE product.id = %s AND product.is_active AND product.stock >= %s
+                    AND %s >= 1
+                ON CONFLICT (user_id, product_id) DO UPDATE SET
+                    quantity = {cls._meta.db_table}.quantity + excluded.quantity,
+                    updated_at = excluded.updated_at
+                WHERE {cls._meta.db_table}.quantity + excluded.quantity <= (
+                    SELECT stock FROM {Product._meta.db_table}
+                    WHERE id = excluded.product_id AND is_active
+                )
+                RETURNING id
+                """,
+                [user.pk, quantity, now, now, product_id, quantity, quantity]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def shipping_for(cls, subtotal):
+        return Decimal('0') if subtotal >= cls.FREE_SHIPPING_FROM else cls.SHIPPING_COST
+
+
+class CatalogVersion(models.Model):
+    """
+    Single row stamping the catalog, bumped after every catalog write (see
+    shop/cache.py). Kept in the database so every worker sees the same value.
+    """
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Versión del catálogo'
+        verbose_name_plural = 'Versión del catálogo'
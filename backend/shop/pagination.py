@@ -0,0 +1,176 @@
+"""
+Pagination for the shop API.
+
+Page numbers (?page=) stay the default. Clients opt into keyset pagination
+per request with ?pagination=cursor: the response then carries opaque
+next/previous cursors instead of a count, and every page is fetched with a
+WHERE on the ordering columns, so deep pages cost the same as the first one
+(no COUNT(*) and no OFFSET).
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    # Full precision: the position must compare equal to the stored value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class ShopPagination(PageNumberPagination):
+    """Page number pagination with an opt-in keyset (cursor) mode"""
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    cursor_template = 'rest_framework/pagination/previous_and_next.html'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        self.use_cursor = (
+            params.get(self.mode_query_param) == 'cursor' or
+            self.cursor_query_param in params
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_keyset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.results:
+            return None
+        return self.cursor_link(self.results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.results:
+            return None
+        return self.cursor_link(self.results[0], reverse=True)
+
+    def get_html_context(self):
+        if not self.use_cursor:
+            return super().get_html_context()
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+        }
+
+    # =================================================
+    # KEYSET MODE
+    # =================================================
+
+    def paginate_keyset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        self.model = queryset.model
+        self.ordering = self.get_keyset_ordering(queryset)
+
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.flip(field) for field in ordering]
+        results = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.results = results
+        if self.template is not None:
+            self.template = self.cursor_template
+            self.display_page_controls = True
+        return results
+
+    def get_keyset_ordering(self, queryset):
+        """Ordering applied by the view (or model default) plus a pk tiebreaker"""
+        ordering = list(queryset.query.order_by or self.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering.append('-pk')
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def keyset_filter(self, position, reverse):
+        """Rows strictly after position: (a > x) OR (a = x AND b > y) OR ..."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def cursor_link(self, obj, reverse):
+        position = [
+            _encode_value(getattr(obj, field.lstrip('-')))
+            for field in self.ordering
+        ]
+        payload = json.dumps({'r': reverse, 'p': position}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            reverse, position = bool(payload['r']), payload['p']
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.to_python(field.lstrip('-'), value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def to_python(self, name, value):
+        if name == 'pk':
+            return self.model._meta.pk.to_python(value)
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotation such as search_rank
+            return value
+        return field.to_python(value)
@@ -0,0 +1,31 @@
+"""
+Request parsers matching shop.renderers (orjson JSON and MessagePack).
+"""
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+
+from .renderers import msgpack, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """Drop-in JSONParser backed by orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise UnsupportedMediaType(media_type)
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,78 @@
+"""
+"Customers also bought" recommendations from order history.
+
+build_related_products() reads OrderItem grouped by order once, counts how
+often every pair of products shares an order (a sparse item-item
+co-occurrence matrix held as dicts) and scores each pair with cosine
+similarity: co_orders(a, b) / sqrt(orders(a) * orders(b)). The top
+neighbours of each product are stored in RelatedProduct, so serving them
+is one indexed lookup. Run it offline with `manage.py build_related_products`.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+
+from django.db import transaction
+
+from .cache import bump_catalog_version
+from .models import OrderItem, RelatedProduct
+
+
+RELATED_TOP_K = 12
+
+# Bulk orders with dozens of lines say little about affinity and cost
+# O(n^2) pairs; they are left out of the matrix.
+MAX_ORDER_SIZE = 50
+
+
+def co_occurrence():
+    """(orders per product, co-orders per product pair) from every non-cancelled order"""
+    lines = OrderItem.objects.filter(
+        product__isnull=False
+    ).exclude(
+        order__status='cancelled'
+    ).order_by('order_id').values_list('order_id', 'product_id').iterator(chunk_size=2000)
+
+    orders = Counter()
+    pairs = defaultdict(Counter)
+    for _, group in groupby(lines, key=lambda line: line[0]):
+        products = sorted({product_id for _, product_id in group})
+        if len(products) > MAX_ORDER_SIZE:
+            continue
+        orders.update(products)
+        for a, b in combinations(products, 2):
+            pairs[a][b] += 1
+            pairs[b][a] += 1
+    return orders, pairs
+
+
+def top_neighbours(orders, pairs, top_k=RELATED_TOP_K):
+    """{product_id: [(score, related_id), ...]} best first"""
+    neighbours = {}
+    for product_id, counts in pairs.items():
+        scored = (
+            (count / math.sqrt(orders[product_id] * orders[other]), other)
+            for other, count in counts.items()
+        )
+        # Ties broken by the lower id so rebuilds are deterministic
+        neighbours[product_id] = heapq.nsmallest(
+            top_k, scored, key=lambda item: (-item[0], item[1])
+        )
+    return neighbours
+
+
+def build_related_products(top_k=RELATED_TOP_K):
+    """Recompute and replace every RelatedProduct row; returns the number stored"""
+    orders, pairs = co_occurrence()
+    rows = [
+        RelatedProduct(product_id=product_id, related_id=related_id, score=score, rank=rank)
+        for product_id, scored in top_neighbours(orders, pairs, top_k).items()
+        for rank, (score, related_id) in enumerate(scored)
+    ]
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(rows, batch_size=2000)
+        # Related rails are served with catalog ETags
+        transaction.on_commit(bump_catalog_version)
+    return len(rows)
@@ -0,0 +1,69 @@
+"""
+Faster response renderers.
+
+FastJSONRenderer renders with orjson and falls back to DRF's JSON encoder
+when orjson is missing or an indented response is requested. Datetimes go
+through DRF's encoder too (orjson writes microseconds and +00:00, DRF
+milliseconds and Z), and non-string keys (DRF's ListField errors are keyed
+by index) are allowed, so both renderers return the same bytes. MessagePackRenderer answers
+`Accept: application/msgpack` (or ?format=msgpack) with the same data.
+"""
+from rest_framework import renderers
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+# Applied only when orjson is importable
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+def encode_default(obj):
+    # Same conversions as DRF's JSONEncoder (e.g. Decimal -> float, lazy
+    # strings, querysets) so every renderer returns the same values
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Drop-in JSONRenderer backed by orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Compact binary responses for clients that ask for MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise NotAcceptable('MessagePack no está disponible en este servidor.')
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -0,0 +1,231 @@
+"""
+On-demand image resizing for /media/resize/<w>x<h>/<path>.
+
+Requested sides are snapped up to RESIZE_SIZES, so each source has a small
+fixed set of boxes to build and an unauthenticated client cannot drive
+unbounded resize and encode work by walking through sizes.
+
+Resized files are kept in a disk cache (settings.IMAGE_RESIZE_CACHE_DIR)
+named by a hash of the source file identity (path, size, mtime), the box,
+the fit mode and the format, so a replaced source never serves a stale
+copy. Each key is built by one request at a time: concurrent requests for
+a missing key wait on a per-key lock (threads and, where fcntl exists,
+processes) and then read the file the first one wrote. When the cache
+grows past IMAGE_RESIZE_CACHE_MB, least recently served files are evicted.
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .images import available_formats, encode
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread locks only
+    fcntl = None
+
+
+MAX_RESIZE_DIMENSION = 4096
+# Allowed box sides; larger requests get the largest
+RESIZE_SIZES = (64, 128, 160, 240, 320, 480, 640, 800, 1024, 1280, 1600, 2048)
+RESIZE_FITS = ('contain', 'cover')
+RESIZE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif'}
+CONTENT_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+# Evict down to this share of the budget so evictions are not per request
+EVICT_TO = 0.9
+
+
+class ResizeError(Exception):
+    pass
+
+
+def source_path(path):
+    """Absolute file under MEDIA_ROOT, ResizeError for anything else"""
+    root = Path(settings.MEDIA_ROOT).resolve()
+    source = (root / path).resolve()
+    if root not in source.parents or source.suffix.lower() not in RESIZE_EXTENSIONS:
+        raise ResizeError(path)
+    if not source.is_file():
+        raise ResizeError(path)
+    return source
+
+
+def negotiate_format(accept):
+    formats = available_formats()
+    for fmt in ('avif', 'webp'):
+        if fmt in formats and CONTENT_TYPES[fmt] in accept:
+            return fmt
+    return 'jpeg'
+
+
+def snap_size(size):
+    """Smallest allowed side not below size (0 stays free)"""
+    if not size:
+        return 0
+    return next((allowed for allowed in RESIZE_SIZES if allowed >= size), RESIZE_SIZES[-1])
+
+
+def cache_key(source, width, height, fit, fmt):
+    stat = source.stat()
+    identity = f'{source}|{stat.st_size}|{stat.st_mtime_ns}|{width}x{height}|{fit}|{fmt}'
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def cache_path(key, fmt):
+    return Path(settings.IMAGE_RESIZE_CACHE_DIR) / key[:2] / f'{key}.{fmt}'
+
+
+def resized_file(path, width, height, fit, fmt):
+    """(open cached file, cache key), resizing on a miss"""
+    if fit not in RESIZE_FITS:
+        raise ResizeError(fit)
+    if not (0 <= width <= MAX_RESIZE_DIMENSION and 0 <= height <= MAX_RESIZE_DIMENSION):
+        raise ResizeError(f'{width}x{height}')
+    if not width and not height:
+        raise ResizeError(f'{width}x{height}')
+
+    width, height = snap_size(width), snap_size(height)
+    source = source_path(path)
+    key = cache_key(source, width, height, fit, fmt)
+    target = cache_path(key, fmt)
+    # Files are opened before anything can evict them; an open file
+    # outlives its removal
+    try:
+        file = open(target, 'rb')
+        touch(target)
+        return file, key
+    except FileNotFoundError:
+        pass
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with key_lock(target):
+        try:
+            # Another request may have built it while we waited
+            file = open(target, 'rb')
+        except FileNotFoundError:
+            data = resize(source, width, height, fit, fmt)
+            partial = target.with_name(f'{target.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            partial.write_bytes(data)
+            os.replace(partial, target)
+            file = open(target, 'rb')
+            evict(len(data))
+    return file, key
+
+
+def resize(source, width, height, fit, fmt):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        # 0 leaves that side free, keeping the aspect ratio
+        box = (
+            width or round(image.width * height / image.height),
+            height or round(image.height * width / image.width),
+        )
+        if fit == 'cover':
+            image = ImageOps.fit(image, box, Image.LANCZOS)
+        else:
+            image = image.copy()
+            image.thumbnail(box, Image.LANCZOS)
+        return encode(image, fmt)
+
+
+def touch(path):
+    # mtime doubles as the last-served time for LRU eviction
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+# =====================================================
+# SINGLE FLIGHT
+# =====================================================
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def key_lock(target):
+    with _locks_guard:
+        lock, users = _locks.get(target, (threading.Lock(), 0))
+        _locks[target] = (lock, users + 1)
+    try:
+        with lock:
+            if fcntl is None:
+                yield
+            else:
+                with open(f'{target}.lock', 'w') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        with _locks_guard:
+            lock, users = _locks[target]
+            if users == 1:
+                del _locks[target]
+            else:
+                _locks[target] = (lock, users - 1)
+
+
+# =====================================================
+# LRU EVICTION
+# =====================================================
+
+_cache_bytes = None
+_eviction_lock = threading.Lock()
+
+
+def evict(added):
+    """Track the cache size and drop the least recently served files past the budget"""
+    global _cache_bytes
+    budget = settings.IMAGE_RESIZE_CACHE_MB * 1024 * 1024
+    with _eviction_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, _, size in cache_entries())
+        else:
+            _cache_bytes += added
+        if _cache_bytes <= budget:
+            return
+
+        # Rescan: other processes share the directory
+        entries = sorted(cache_entries())
+        total = sum(size for _, _, size in entries)
+        for mtime, path, size in entries:
+            if total <= budget * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                continue
+            try:
+                os.remove(f'{path}.lock')
+            except FileNotFoundError:
+                pass
+        _cache_bytes = total
+
+
+def cache_entries():
+    """(mtime, path, size) of every cached file"""
+    root = Path(settings.IMAGE_RESIZE_CACHE_DIR)
+    if not root.exists():
+        return
+    for directory in os.scandir(root):
+        if not directory.is_dir():
+            continue
+        for entry in os.scandir(directory.path):
+            if entry.name.endswith(('.lock', '.tmp')):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, entry.path, stat.st_size
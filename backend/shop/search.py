@@ -0,0 +1,176 @@
+"""
+Full-text product search.
+
+PostgreSQL: stored tsvector (Spanish config, unaccent) on Product.search_vector
+with a GIN index. SQLite: FTS5 table shop_product_fts (diacritics removed).
+Any other backend falls back to icontains without ranking.
+"""
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from .models import Product
+
+
+SEARCH_CONFIG = 'spanish'
+SEARCH_WEIGHTS = {
+    'name': 'A',
+    'short_description': 'B',
+    'artisan_name': 'B',
+    'materials': 'B',
+    'description': 'C',
+}
+SEARCH_FIELDS = tuple(SEARCH_WEIGHTS)
+FTS_TABLE = 'shop_product_fts'
+
+
+def _tokens(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _unaccent(expression):
+    return Func(expression, function='unaccent')
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def _backend(alias):
+    vendor = connections[alias].vendor
+    if vendor == 'postgresql':
+        return 'postgresql'
+    if vendor == 'sqlite' and _has_fts_table(alias):
+        return 'sqlite'
+    return None
+
+
+def product_search_vector():
+    """Weighted, accent-folded tsvector expression over SEARCH_FIELDS"""
+    vector = None
+    for field, weight in SEARCH_WEIGHTS.items():
+        part = SearchVector(
+            _unaccent(F(field)),
+            config=SEARCH_CONFIG,
+            weight=weight
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+# =====================================================
+# QUERYING
+# =====================================================
+
+def search_products(queryset, query):
+    """
+    Restrict queryset to products matching query and annotate search_rank
+    (higher is more relevant). Every word must match, as a prefix.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    backend = _backend(queryset.db)
+
+    if backend == 'postgresql':
+        search_query = SearchQuery(
+            _unaccent(Value(' & '.join(f'{token}:*' for token in tokens))),
+            config=SEARCH_CONFIG,
+            search_type='raw'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            # ts_rank is real; cast so cursor positions compare exactly
+            search_rank=Cast(
+                SearchRank(F('search_vector'), search_query),
+                FloatField()
+            )
+        )
+
+    if backend == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        table = Product._meta.db_table
+        # Join the FTS table so MATCH runs once; a correlated rank subquery
+        # would rerun the full-text query for every matching product
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE} MATCH %s', f'{FTS_TABLE}.rowid = {table}.id'],
+            params=[match]
+        ).annotate(
+            # FTS5 rank is bm25, where lower means more relevant
+            search_rank=RawSQL(f'-{FTS_TABLE}.rank', [], output_field=FloatField())
+        )
+
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+# =====================================================
+# INDEX MAINTENANCE
+# =====================================================
+
+def update_search_index(product):
+    """Refresh the search entry of a single product"""
+    backend = _backend(Product.objects.db)
+
+    if backend == 'postgresql':
+        Product.objects.filter(pk=product.pk).update_unversioned(
+            search_vector=product_search_vector()
+        )
+
+    elif backend == 'sqlite':
+        columns = ', '.join(SEARCH_FIELDS)
+        placeholders = ', '.join(['%s'] * len(SEARCH_FIELDS))
+        with connections[Product.objects.db].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, {placeholders})',
+                [product.pk] + [getattr(product, field) or '' for field in SEARCH_FIELDS]
+            )
+
+
+def remove_from_search_index(product_pk):
+    # The PostgreSQL vector lives on the row itself
+    if _backend(Product.objects.db) == 'sqlite':
+        with connections[Product.objects.db].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_pk])
+
+
+def rebuild_search_index():
+    """Re-index every product; returns the number of products indexed"""
+    backend = _backend(Product.objects.db)
+
+    if backend == 'postgresql':
+        return Product.objects.update_unversioned(
+            search_vector=product_search_vector()
+        )
+
+    if backend == 'sqlite':
+        columns = ', '.join(SEARCH_FIELDS)
+        values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+        with connections[Product.objects.db].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+                f'SELECT id, {values} FROM {Product._meta.db_table}'
+            )
+        return Product.objects.count()
+
+    return 0
@@ -1,51 +1,165 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, IntegerField, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from .images import image_info, srcset
+from .storage import absolute_media_url
 from .models import (
     Category, Product, ProductImage, 
     UserProfile, Order, OrderItem, Wishlist, CartItem
 )
 
 
+# =====================================================
+# SPARSE FIELDSETS
+# =====================================================
+
+class DynamicFieldsMixin:
+    """
+    Response shaping from the request query string:
+      ?fields=id,price,product.name  only these fields (dotted for nested ones)
+      ?expand=category               embed expandable_fields instead of ids
+    Fields that are left out are never evaluated, so their queries and
+    build_absolute_uri calls are skipped too.
+    """
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+
+        path = self.field_path()
+        expand = self.requested(request.query_params.get('expand'), path)
+        for name, serializer_class in self.expandable_fields.items():
+            if expand and name in expand:
+                fields[name] = serializer_class(read_only=True)
+
+        only = self.requested(request.query_params.get('fields'), path)
+        if only:
+            for name in list(fields):
+                if name not in only and not fields[name].write_only:
+                    del fields[name]
+        return fields
+
+    def field_path(self):
+        """Dotted position of this serializer below the root one"""
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    @staticmethod
+    def requested(value, path):
+        """Field names a comma separated param selects at path, None if none"""
+        if not value:
+            return None
+        prefix = f'{path}.' if path else ''
+        names = {
+            item[len(prefix):].split('.')[0]
+            for item in value.split(',')
+            if item.startswith(prefix) and item[len(prefix):]
+        }
+        return names or None
+
+
 # =====================================================
 # PRODUCT SERIALIZERS
 # =====================================================
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class MediaImageField(serializers.ImageField):
+    """ImageField whose URL is made absolute by absolute_media_url"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return value.url
+        return absolute_media_url(request)(value.url)
+
+
+class ProductImageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for product images"""
+    image = MediaImageField(read_only=True)
     image_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+    width = serializers.SerializerMethodField()
+    height = serializers.SerializerMethodField()
+    placeholder = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'image_url', 'alt_text', 'is_primary', 'order']
+        fields = [
+            'id', 'image', 'image_url', 'srcset', 'width', 'height', 'placeholder',
+            'alt_text', 'is_primary', 'order'
+        ]
 
     def get_image_url(self, obj):
         request = self.context.get('request')
         if obj.image and request:
-            return request.build_absolute_uri(obj.image.url)
+            return absolute_media_url(request)(obj.image.url)
         return None
 
+    def get_srcset(self, obj):
+        request = self.context.get('request')
+        if request:
+            return srcset(obj.image_variants, absolute_media_url(request))
+        return None
+
+    def get_width(self, obj):
+        return image_info(obj.image_variants)[0]
+
+    def get_height(self, obj):
+        return image_info(obj.image_variants)[1]
+
+    def get_placeholder(self, obj):
+        return image_info(obj.image_variants)[2]
 
-class CategorySerializer(serializers.ModelSerializer):
+
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for categories"""
+    image = MediaImageField(read_only=True)
     product_count = serializers.ReadOnlyField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = [
-            'id', 'name', 'slug', 'description', 'image', 
+            'id', 'name', 'slug', 'description', 'image', 'image_srcset',
             'icon', 'product_count', 'is_active'
         ]
 
+    def get_image_srcset(self, obj):
+        request = self.context.get('request')
+        if request:
+            return srcset(obj.image_variants, absolute_media_url(request))
+        return None
 
-class ProductListSerializer(serializers.ModelSerializer):
+
+class ProductListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for product listings"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
     primary_image = serializers.SerializerMethodField()
+    primary_image_srcset = serializers.SerializerMethodField()
+    primary_image_width = serializers.SerializerMethodField()
+    primary_image_height = serializers.SerializerMethodField()
+    primary_image_placeholder = serializers.SerializerMethodField()
     in_stock = serializers.ReadOnlyField()
     discount_percentage = serializers.ReadOnlyField()
 
+    expandable_fields = {'category': CategorySerializer}
+
     class Meta:
         model = Product
         fields = [
@@ -53,20 +167,121 @@ class ProductListSerializer(serializers.ModelSerializer):
             'price', 'original_price', 'discount_percentage',
             'category', 'category_name', 'category_slug',
             'badge', 'stock', 'in_stock',
-            'primary_image', 'is_featured'
+            'primary_image', 'primary_image_srcset', 'primary_image_width',
+            'primary_image_height', 'primary_image_placeholder', 'is_featured'
         ]
 
     def get_primary_image(self, obj):
+        # Denormalized on Product; views select_related('primary_image')
         request = self.context.get('request')
-        primary = obj.images.filter(is_primary=True).first()
-        if not primary:
-            primary = obj.images.first()
+        primary = obj.primary_image
         if primary and request:
-            return request.build_absolute_uri(primary.image.url)
+            return absolute_media_url(request)(primary.image.url)
         return None
 
+    def get_primary_image_srcset(self, obj):
+        request = self.context.get('request')
+        primary = obj.primary_image
+        if primary and request:
+            return srcset(primary.image_variants, absolute_media_url(request))
+        return None
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+    def get_primary_image_width(self, obj):
+        primary = obj.primary_image
+        return image_info(primary.image_variants)[0] if primary else None
+
+    def get_primary_image_height(self, obj):
+        primary = obj.primary_image
+        return image_info(primary.image_variants)[1] if primary else None
+
+    def get_primary_image_placeholder(self, obj):
+        primary = obj.primary_image
+        return image_info(primary.image_variants)[2] if primary else None
+
+
+class FastProductListSerializer:
+    """
+    Compiled equivalent of ProductListSerializer(many=True) for list
+    endpoints (opt-in with settings.FAST_LIST_SERIALIZATION).
+
+    Builds the response dicts straight from .values() rows, with in_stock and
+    discount_percentage computed by the database, skipping DRF field dispatch.
+    Output is identical to ProductListSerializer (check_fast_serializer).
+    """
+    VALUES = [
+        'id', 'name', 'slug', 'short_description', 'price', 'original_price',
+        'category_id', 'category__name', 'category__slug', 'badge', 'stock',
+        'primary_image__image', 'primary_image__image_variants', 'is_featured',
+    ]
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @classmethod
+    def values(cls, queryset):
+        """Turn a product queryset into the rows this serializer reads"""
+        # int() of the discount, done on whole cents so it is exact everywhere
+        original_cents = Cast(Round(F('original_price') * 100), IntegerField())
+        price_cents = Cast(Round(F('price') * 100), IntegerField())
+        return queryset.annotate(
+            fast_in_stock=Case(
+                When(stock__gt=0, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            fast_discount=Case(
+                When(
+                    original_price__gt=F('price'),
+                    then=(original_cents - price_cents) * 100 / original_cents
+                ),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+        ).values(*cls.VALUES, 'fast_in_stock', 'fast_discount')
+
+    @property
+    def data(self):
+        request = self.context.get('request')
+        decimal = ProductListSerializer().fields['price'].to_representation
+        image_url = ProductImage._meta.get_field('image').storage.url
+        absolute = absolute_media_url(request) if request else None
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'short_description': row['short_description'],
+                'price': decimal(row['price']),
+                'original_price': (
+                    decimal(row['original_price'])
+                    if row['original_price'] is not None else None
+                ),
+                'discount_percentage': row['fast_discount'],
+                'category': row['category_id'],
+                'category_name': row['category__name'],
+                'category_slug': row['category__slug'],
+                'badge': row['badge'],
+                'stock': row['stock'],
+                'in_stock': row['fast_in_stock'],
+                'primary_image': (
+                    absolute(image_url(row['primary_image__image']))
+                    if row['primary_image__image'] and request else None
+                ),
+                'primary_image_srcset': (
+                    srcset(row['primary_image__image_variants'], absolute)
+                    if row['primary_image__image'] and request else None
+                ),
+                'primary_image_width': image_info(row['primary_image__image_variants'])[0],
+                'primary_image_height': image_info(row['primary_image__image_variants'])[1],
+                'primary_image_placeholder': image_info(row['primary_image__image_variants'])[2],
+                'is_featured': row['is_featured'],
+            }
+            for row in self.rows
+        ]
+
+
+class ProductDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Full serializer for product detail page"""
     category = CategorySerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
@@ -201,7 +416,7 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
 # CART SERIALIZERS
 # =====================================================
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for cart items"""
     product = ProductListSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
@@ -210,25 +425,112 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'product_id', 'quantity', 'subtotal']
+        extra_kwargs = {'quantity': {'min_value': 1}}
 
     def create(self, validated_data):
         user = self.context['request'].user
         product_id = validated_data['product_id']
         quantity = validated_data.get('quantity', 1)
         
-        # Update if exists, create if not
-        cart_item, created = CartItem.objects.update_or_create(
-            user=user,
-            product_id=product_id,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            # If item existed, add to quantity
-            cart_item.quantity += quantity
-            cart_item.save()
+        # Insert or increment atomically, checked against stock
+        pk = CartItem.add_quantity(user, product_id, quantity)
+        if pk is None:
+            product = Product.objects.filter(pk=product_id, is_active=True).only('stock').first()
+            if product is None:
+                raise serializers.ValidationError({'product_id': 'Producto no disponible.'})
+            raise serializers.ValidationError({
+                'quantity': f'Solo hay {product.stock} unidades disponibles.'
+            })
         
-        return cart_item
+        return CartItem.objects.select_related(
+            'product__category', 'product__primary_image'
+        ).get(pk=pk)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """One line of a cart batch: set, add to or remove a product"""
+    ACTIONS = ('set', 'add', 'remove')
+
+    product_id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=ACTIONS, default='set')
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Applies a whole cart diff in one transaction: operations run in order
+    against the current quantities, then the result is written with one
+    delete, one bulk_update and one bulk_create. A line ending at 0 is
+    removed.
+    """
+    MAX_OPERATIONS = 200
+
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=MAX_OPERATIONS)
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        operations = validated_data['operations']
+        product_ids = {operation['product_id'] for operation in operations}
+
+        with transaction.atomic():
+            # Locks the user's rows against concurrent syncs until commit
+            existing = {
+                item.product_id: item
+                for item in CartItem.objects.select_for_update().filter(
+                    user=user, product_id__in=product_ids
+                )
+            }
+            stock = dict(
+                Product.objects.filter(pk__in=product_ids, is_active=True).values_list('id', 'stock')
+            )
+
+            quantities = {product_id: item.quantity for product_id, item in existing.items()}
+            for operation in operations:
+                product_id = operation['product_id']
+                if operation['action'] == 'remove':
+                    quantities[product_id] = 0
+                elif operation['action'] == 'add':
+                    quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+                else:
+                    quantities[product_id] = operation['quantity']
+
+            errors = {}
+            for product_id, quantity in quantities.items():
+                if not quantity:
+                    continue
+                if product_id not in stock:
+                    errors[str(product_id)] = 'Producto no disponible.'
+                elif quantity > stock[product_id]:
+                    errors[str(product_id)] = f'Solo hay {stock[product_id]} unidades disponibles.'
+            if errors:
+                raise serializers.ValidationError({'operations': errors})
+
+            now = timezone.now()
+            removed, changed, added = [], [], []
+            for product_id, quantity in quantities.items():
+                item = existing.get(product_id)
+                if not quantity:
+                    if item:
+                        removed.append(product_id)
+                elif item is None:
+                    added.append(CartItem(user=user, product_id=product_id, quantity=quantity))
+                elif item.quantity != quantity:
+                    item.quantity, item.updated_at = quantity, now
+                    changed.append(item)
+
+            if removed:
+                CartItem.objects.filter(user=user, product_id__in=removed).delete()
+            if changed:
+                CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+            if added:
+                # A line added by another request since the read keeps this batch's quantity
+                CartItem.objects.bulk_create(
+                    added,
+                    update_conflicts=True,
+                    unique_fields=['user', 'product'],
+                    update_fields=['quantity', 'updated_at']
+                )
+        return quantities
 
 
 class CartSerializer(serializers.Serializer):
@@ -244,7 +546,7 @@ class CartSerializer(serializers.Serializer):
 # WISHLIST SERIALIZERS
 # =====================================================
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for wishlist items"""
     product = ProductListSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
@@ -268,7 +570,7 @@ class WishlistSerializer(serializers.ModelSerializer):
 # ORDER SERIALIZERS
 # =====================================================
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for order items"""
     subtotal = serializers.ReadOnlyField()
 
@@ -277,7 +579,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product_name', 'product_price', 'quantity', 'subtotal']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for orders"""
     items = OrderItemSerializer(many=True, read_only=True)
     full_name = serializers.ReadOnlyField()
@@ -321,41 +623,43 @@ class CreateOrderSerializer(serializers.ModelSerializer):
         items_data = validated_data.pop('items')
         user = self.context['request'].user if self.context['request'].user.is_authenticated else None
         
-        # Calculate totals
+        # Calculate totals (JSON prices arrive as floats; shipping is a Decimal)
         subtotal = sum(
-            item['price'] * item['quantity'] 
-            for item in items_data
+            (Decimal(str(item['price'])) * item['quantity'] for item in items_data),
+            Decimal('0')
         )
-        shipping = 0 if subtotal >= 500 else 35
+        shipping = CartItem.shipping_for(subtotal)
         total = subtotal + shipping
         
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            subtotal=subtotal,
-            shipping_cost=shipping,
-            total=total,
-            **validated_data
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            product = Product.objects.filter(id=item_data['product_id']).first()
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                product_name=item_data['name'],
-                product_price=item_data['price'],
-                quantity=item_data['quantity']
+        # One transaction, so item signals (popularity) run once at commit
+        with transaction.atomic():
+            # Create order
+            order = Order.objects.create(
+                user=user,
+                subtotal=subtotal,
+                shipping_cost=shipping,
+                total=total,
+                **validated_data
             )
-            
-            # Reduce stock
-            if product:
-                product.stock = max(0, product.stock - item_data['quantity'])
-                product.save()
-        
-        # Clear user's cart if logged in
-        if user:
-            CartItem.objects.filter(user=user).delete()
-        
+
+            # Create order items
+            for item_data in items_data:
+                product = Product.objects.filter(id=item_data['product_id']).first()
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    product_name=item_data['name'],
+                    product_price=item_data['price'],
+                    quantity=item_data['quantity']
+                )
+
+                # Reduce stock
+                if product:
+                    product.stock = max(0, product.stock - item_data['quantity'])
+                    product.save(update_fields=['stock', 'updated_at'])
+
+            # Clear user's cart if logged in
+            if user:
+                CartItem.objects.filter(user=user).delete()
+
         return order
\ No newline at end of file
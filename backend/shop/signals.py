@@ -0,0 +1,179 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .images import generate_variants, variants_current
+from .models import Category, Order, OrderItem, Product, ProductImage, Wishlist
+from .search import (
+    SEARCH_FIELDS, update_search_index, remove_from_search_index
+)
+
+
+# =====================================================
+# CATALOG CACHE VERSION
+# =====================================================
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Bump after commit so readers never re-cache pre-commit data
+    transaction.on_commit(bump_catalog_version)
+
+
+# =====================================================
+# PRIMARY IMAGE SYNC
+# =====================================================
+
+@receiver(pre_save, sender=ProductImage)
+def remember_image_product(sender, instance, **kwargs):
+    """Store the persisted product to detect images moved between products"""
+    instance._previous_product_id = None
+    if instance.pk:
+        instance._previous_product_id = ProductImage.objects.filter(
+            pk=instance.pk
+        ).values_list('product_id', flat=True).first()
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def sync_primary_image(sender, instance, **kwargs):
+    """Keep Product.primary_image in sync when images change"""
+    # A moved image also leaves its previous product
+    product_ids = {instance.product_id, getattr(instance, '_previous_product_id', None)}
+    for product in Product.objects.filter(pk__in=product_ids - {None}):
+        product.refresh_primary_image()
+
+
+# =====================================================
+# IMAGE VARIANTS
+# =====================================================
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Category)
+def schedule_image_variants(sender, instance, **kwargs):
+    """Resize new uploads in the process pool once the row is committed"""
+    if not instance.image:
+        if instance.image_variants:
+            sender.objects.filter(pk=instance.pk).update(image_variants={})
+        return
+    if not variants_current(instance.image_variants, instance.image):
+        transaction.on_commit(lambda: generate_variants(instance))
+
+
+# =====================================================
+# CATEGORY PRODUCT COUNTS
+# =====================================================
+
+def refresh_counts_on_commit(category_ids):
+    # Recount after commit so concurrent edits always see each other's rows
+    category_ids = {pk for pk in category_ids if pk is not None}
+    if category_ids:
+        transaction.on_commit(
+            lambda: Category.refresh_product_counts(category_ids)
+        )
+
+
+@receiver(pre_save, sender=Product)
+def remember_counted_state(sender, instance, **kwargs):
+    """Store the persisted category/is_active to detect counter changes"""
+    instance._counted_state = None
+    if instance.pk:
+        instance._counted_state = Product.objects.filter(
+            pk=instance.pk
+        ).values_list('category_id', 'is_active').first()
+
+
+@receiver(post_save, sender=Product)
+def update_counts_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_counted_state', None)
+    current = (instance.category_id, instance.is_active)
+    if previous == current:
+        return
+    previous_category = previous[0] if previous else None
+    refresh_counts_on_commit({instance.category_id, previous_category})
+
+
+@receiver(post_delete, sender=Product)
+def update_counts_on_delete(sender, instance, **kwargs):
+    refresh_counts_on_commit({instance.category_id})
+
+
+# =====================================================
+# POPULARITY
+# =====================================================
+
+# Products waiting for a popularity refresh, per thread: every line of an
+# order adds to the same set and the first commit callback refreshes them all
+_popularity = threading.local()
+
+
+def refresh_popularity_on_commit(product_ids):
+    # Only the products touched by the order or wishlist change; decay of
+    # older sales is applied by `manage.py refresh_popularity`
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if product_ids:
+        pending = getattr(_popularity, 'product_ids', None)
+        if pending is None:
+            pending = _popularity.product_ids = set()
+        pending.update(product_ids)
+        transaction.on_commit(flush_popularity)
+
+
+def flush_popularity():
+    # Later callbacks of the same commit find the set empty. Ids left by a
+    # rolled back transaction are refreshed with the next commit, harmlessly.
+    product_ids = getattr(_popularity, 'product_ids', None)
+    if product_ids:
+        _popularity.product_ids = set()
+        Product.refresh_popularity(product_ids)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def update_popularity(sender, instance, **kwargs):
+    refresh_popularity_on_commit({instance.product_id})
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = Order.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Order)
+def update_popularity_on_cancel(sender, instance, created, **kwargs):
+    """Cancelled orders stop counting as sales (and count again if restored)"""
+    previous = getattr(instance, '_previous_status', None)
+    if created or (previous == 'cancelled') == (instance.status == 'cancelled'):
+        return
+    refresh_popularity_on_commit(
+        instance.items.values_list('product_id', flat=True)
+    )
+
+
+# =====================================================
+# SEARCH INDEX
+# =====================================================
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    update_search_index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    remove_from_search_index(instance.pk)
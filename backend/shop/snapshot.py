@@ -0,0 +1,199 @@
+"""
+In-process catalog snapshot (opt-in with settings.CATALOG_SNAPSHOT).
+
+Active products are held in memory as __slots__ rows carrying the columns
+ProductViewSet filters and orders by, plus their ProductListSerializer
+payload rendered once at load time. Each request compares the catalog
+version (see cache.py) with the loaded one and, when it moved, re-reads only
+the products updated since the last load. A list request otherwise runs a
+single query, the catalog version read that the ETag check shares.
+"""
+import threading
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Max
+from rest_framework.response import Response
+
+from .cache import catalog_version
+from .filters import ProductOrderingFilter, with_tiebreaker
+from .images import srcset
+from .models import Category, Product
+from .serializers import ProductListSerializer
+from .storage import absolute_media_url
+
+
+# Rows committed late can carry an updated_at older than the last load;
+# re-read this far back on every incremental refresh to catch them.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Order of the loaded rows, the same as ProductViewSet without ?ordering=
+DEFAULT_ORDERING = with_tiebreaker(Product._meta.ordering)
+
+# Text orderings follow the database collation, not Python code points
+COLLATED_FIELDS = {'name'}
+
+
+class ProductRow:
+    __slots__ = (
+        'id', 'name', 'price', 'category_slug', 'badge', 'stock',
+        'is_featured', 'created_at', 'popularity', 'image_url', 'image_variants',
+        'payload'
+    )
+
+    def __init__(self, product, payload):
+        self.id = product.id
+        self.name = product.name
+        self.price = product.price
+        self.category_slug = product.category.slug
+        self.badge = product.badge
+        self.stock = product.stock
+        self.is_featured = product.is_featured
+        self.created_at = product.created_at
+        self.popularity = product.popularity
+        self.image_url = product.primary_image.image.url if product.primary_image else None
+        self.image_variants = (
+            product.primary_image.image_variants if product.primary_image else None
+        )
+        self.payload = payload
+
+    def to_representation(self, request):
+        data = dict(self.payload)
+        if self.image_url and request:
+            absolute = absolute_media_url(request)
+            data['primary_image'] = absolute(self.image_url)
+            data['primary_image_srcset'] = srcset(self.image_variants, absolute)
+        return data
+
+
+class CatalogSnapshot:
+    def __init__(self):
+        self.version = None
+        self.high_water = None
+        self.rows = {}
+        self.ordered = []
+        self.lock = threading.Lock()
+
+    def products(self, request=None):
+        """Active products in default ordering, refreshed if the catalog moved"""
+        version = catalog_version(request)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.refresh()
+                    self.version = version
+        return self.ordered
+
+    def refresh(self):
+        products = Product.objects.select_related('category', 'primary_image')
+        high_water = Product.objects.aggregate(last=Max('updated_at'))['last']
+
+        since = self.high_water - REFRESH_OVERLAP if self.high_water else None
+        if since is None or Category.objects.filter(updated_at__gte=since).exists():
+            # Category edits are embedded in every row of the category
+            rows = self.build_rows(products.filter(is_active=True))
+        else:
+            rows = dict(self.rows)
+            changed = list(products.filter(updated_at__gte=since))
+            rows.update(self.build_rows(p for p in changed if p.is_active))
+            for product in changed:
+                if not product.is_active:
+                    rows.pop(product.id, None)
+            # Deleted products leave no updated_at behind, and popularity is
+            # written without touching it (see Product.refresh_popularity)
+            active = dict(
+                Product.objects.filter(is_active=True).values_list('id', 'popularity')
+            )
+            rows = {pk: row for pk, row in rows.items() if pk in active}
+            for pk, row in rows.items():
+                row.popularity = active[pk]
+
+        self.rows = rows
+        self.ordered = sort_rows(rows.values(), DEFAULT_ORDERING)
+        self.high_water = high_water
+
+    @staticmethod
+    def build_rows(products):
+        products = list(products)
+        # No request in context: primary_image is filled in per request
+        payloads = ProductListSerializer(products, many=True).data
+        return {
+            product.id: ProductRow(product, payload)
+            for product, payload in zip(products, payloads)
+        }
+
+
+def sort_rows(rows, ordering):
+    rows = list(rows)
+    # Stable sorts applied from the last key to the first
+    for field in reversed(ordering):
+        name = field.lstrip('-')
+        rows.sort(key=lambda row: getattr(row, name), reverse=field.startswith('-'))
+    return rows
+
+
+def filter_rows(rows, params):
+    """Mirror of ProductViewSet.get_queryset; None when it can't be served"""
+    # Search runs in the database; payloads are pre-rendered in full
+    if params.get('search') or params.get('fields') or params.get('expand'):
+        return None
+
+    try:
+        min_price = Decimal(params['min_price']) if params.get('min_price') else None
+        max_price = Decimal(params['max_price']) if params.get('max_price') else None
+    except InvalidOperation:
+        return None
+
+    category = params.get('category')
+    badge = params.get('badge')
+    in_stock = params.get('in_stock')
+    featured = params.get('featured')
+
+    return [
+        row for row in rows
+        if (not category or row.category_slug == category)
+        and (not badge or row.badge == badge)
+        and (min_price is None or row.price >= min_price)
+        and (max_price is None or row.price <= max_price)
+        and (in_stock != 'true' or row.stock > 0)
+        and (in_stock != 'false' or row.stock == 0)
+        and (featured != 'true' or row.is_featured)
+    ]
+
+
+_snapshot = CatalogSnapshot()
+
+
+def catalog_snapshot():
+    return _snapshot
+
+
+def snapshot_list_response(view, request):
+    """
+    Serve ProductViewSet.list from the snapshot, with the same filters,
+    ordering and page-number pagination. None means use the database.
+    """
+    paginator = view.paginator
+    if paginator is not None and (
+        request.query_params.get(paginator.mode_query_param) == 'cursor' or
+        paginator.cursor_query_param in request.query_params
+    ):
+        return None
+
+    ordering = ProductOrderingFilter().get_ordering(request, view.get_queryset(), view)
+    if COLLATED_FIELDS.intersection(field.lstrip('-') for field in ordering):
+        return None
+
+    rows = filter_rows(_snapshot.products(request), request.query_params)
+    if rows is None:
+        return None
+
+    if list(ordering) != DEFAULT_ORDERING:
+        rows = sort_rows(rows, ordering)
+
+    page = view.paginate_queryset(rows)
+    if page is not None:
+        return view.get_paginated_response(
+            [row.to_representation(request) for row in page]
+        )
+    return Response([row.to_representation(request) for row in rows])
@@ -0,0 +1,63 @@
+"""
+Content-addressed media storage and absolute media URLs.
+
+HashedMediaStorage stores every upload as
+<upload_to>/<hash[:2]>/<hash>.<ext>, hash being the first 32 hex digits of
+the file's SHA-256. Identical uploads therefore share one file, and a name
+never changes content, so the file (and its variants, see images.py) can be
+cached forever (see views.serve_media).
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+HASH_LENGTH = 32
+
+# Any path containing a content hash directory or name is immutable
+HASHED_PATH = re.compile(rf'(^|/)[0-9a-f]{{{HASH_LENGTH}}}(/|\.)')
+
+
+class HashedMediaStorage(FileSystemStorage):
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        key = digest.hexdigest()[:HASH_LENGTH]
+        hashed = os.path.join(directory, key[:2], f'{key}{extension}')
+
+        # Same content already stored: reuse it
+        if self.exists(hashed):
+            return hashed
+        saved = super()._save(hashed, content)
+        if saved != hashed:
+            # A concurrent upload of the same content won the race
+            self.delete(saved)
+        return hashed
+
+
+_hashed_storage = HashedMediaStorage()
+
+
+def hashed_storage():
+    return _hashed_storage
+
+
+def absolute_media_url(request):
+    """
+    Function turning storage URLs into absolute ones: MEDIA_BASE_URL (CDN)
+    when set, otherwise this request's scheme and host, resolved once per request
+    """
+    prefix = settings.MEDIA_BASE_URL
+    if not prefix:
+        prefix = getattr(request, '_media_prefix', None)
+        if prefix is None:
+            prefix = request._media_prefix = request.build_absolute_uri('/').rstrip('/')
+    return lambda url: url if '://' in url else f'{prefix}{url}'
@@ -0,0 +1,37 @@
+"""
+Helpers for streaming large querysets in constant memory.
+
+Rows are read with a server-side cursor (.iterator()) and serialized one
+chunk at a time, so only STREAM_CHUNK_SIZE model instances are alive at once.
+"""
+from itertools import islice
+
+from .renderers import FastJSONRenderer
+
+
+STREAM_CHUNK_SIZE = 500
+
+
+def iter_chunks(queryset, chunk_size=STREAM_CHUNK_SIZE):
+    """Lists of at most chunk_size instances read from a server-side cursor"""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def json_array_stream(queryset, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield a JSON array of serialize(chunk) items piece by piece.
+    serialize receives a list of instances and returns a list of dicts.
+    """
+    renderer = FastJSONRenderer()
+    separator = b''
+    yield b'['
+    for chunk in iter_chunks(queryset, chunk_size):
+        for item in serialize(chunk):
+            yield separator + renderer.render(item)
+            separator = b','
+    yield b']'
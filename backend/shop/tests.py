@@ -0,0 +1,117 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from .models import CartItem, Category, Product
+
+
+def create_product(stock=5, is_active=True):
+    category = Category.objects.create(name='Textiles', slug='textiles')
+    return Product.objects.create(
+        name='Camino de mesa',
+        slug='camino-de-mesa',
+        description='Tejido a mano',
+        price='150.00',
+        category=category,
+        stock=stock,
+        is_active=is_active,
+    )
+
+
+# =====================================================
+# CART
+# =====================================================
+
+class CartItemAddQuantityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='secreto')
+        self.product = create_product(stock=5)
+
+    def add(self, quantity, product=None):
+        return CartItem.add_quantity(self.user, (product or self.product).pk, quantity)
+
+    def quantity(self):
+        return CartItem.objects.get(user=self.user, product=self.product).quantity
+
+    def test_inserts_line(self):
+        pk = self.add(2)
+        self.assertEqual(CartItem.objects.get(pk=pk).quantity, 2)
+
+    def test_increments_existing_line(self):
+        first = self.add(2)
+        second = self.add(3)
+        self.assertEqual(first, second)
+        self.assertEqual(self.quantity(), 5)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_new_line_capped_by_stock(self):
+        self.assertIsNone(self.add(6))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_increment_capped_by_stock(self):
+        self.add(3)
+        self.assertIsNone(self.add(3))
+        self.assertEqual(self.quantity(), 3)
+
+    def test_inactive_product(self):
+        inactive = Product.objects.create(
+            name='Huipil', slug='huipil', description='Tejido a mano',
+            price='300.00', category=self.product.category, stock=5, is_active=False,
+        )
+        self.assertIsNone(self.add(1, inactive))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_increment_of_deactivated_product(self):
+        self.add(1)
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.assertIsNone(self.add(1))
+        self.assertEqual(self.quantity(), 1)
+
+    def test_quantity_below_one(self):
+        self.add(2)
+        for quantity in (0, -1):
+            self.assertIsNone(self.add(quantity))
+        self.assertEqual(self.quantity(), 2)
+
+
+class CartItemConcurrentAddTests(TransactionTestCase):
+    """Adds racing from separate connections, on whatever backend runs the tests"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='secreto')
+        self.product = create_product(stock=5)
+
+    def add_concurrently(self, quantities):
+        barrier = threading.Barrier(len(quantities))
+        results, errors = [], []
+
+        def add(quantity):
+            try:
+                barrier.wait()
+                results.append(CartItem.add_quantity(self.user, self.product.pk, quantity))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add, args=(quantity,)) for quantity in quantities]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_concurrent_adds_increment_one_line(self):
+        results = self.add_concurrently([1, 1, 1, 1])
+        self.assertNotIn(None, results)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(CartItem.objects.get().quantity, 4)
+
+    def test_concurrent_adds_together_exceeding_stock(self):
+        results = self.add_concurrently([3, 3])
+        # Each fits the stock alone; only one of them may be written
+        self.assertEqual(results.count(None), 1)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
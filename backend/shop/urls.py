@@ -10,6 +10,12 @@ router.register(r'products', views.ProductViewSet, basename='product')
 urlpatterns = [
     # Router URLs (categories, products)
     path('', include(router.urls)),
+
+    # Homepage (categories + featured + new arrivals + on sale)
+    path('home/', views.HomeView.as_view(), name='home'),
+
+    # Product feeds (ndjson, csv, xml)
+    path('feeds/products.<str:feed_format>', views.product_feed, name='product_feed'),
     
     # Auth endpoints
     path('auth/register/', views.RegisterView.as_view(), name='register'),
@@ -22,6 +28,7 @@ urlpatterns = [
     path('cart/', views.CartView.as_view(), name='cart'),
     path('cart/<int:pk>/', views.CartItemView.as_view(), name='cart_item'),
     path('cart/clear/', views.clear_cart, name='clear_cart'),
+    path('cart/batch/', views.cart_batch, name='cart_batch'),
     
     # Wishlist endpoints
     path('wishlist/', views.WishlistView.as_view(), name='wishlist'),
@@ -42,7 +49,9 @@ urlpatterns = [
 # ----------
 # GET  /api/categories/                   - List all categories
 # GET  /api/categories/{slug}/            - Get single category
-# GET  /api/categories/{slug}/products/   - Get products in category
+# GET  /api/categories/{slug}/products/   - Get products in category (paginated,
+#                                           accepts the /api/products/ query params;
+#                                           ?stream=true for one streamed JSON array)
 #
 # PRODUCTS
 # --------
@@ -51,6 +60,9 @@ urlpatterns = [
 # GET  /api/products/featured/            - Get featured products
 # GET  /api/products/new_arrivals/        - Get newest products
 # GET  /api/products/on_sale/             - Get products on sale
+# GET  /api/products/facets/              - Facet counts (same query params as list)
+# GET  /api/products/{slug}/related/      - Customers also bought (falls back to
+#                                           products from the same category)
 #
 # Query params for /api/products/:
 #   ?category=macrame                     - Filter by category slug
@@ -61,6 +73,28 @@ urlpatterns = [
 #   ?featured=true                        - Only featured
 #   ?ordering=price                       - Sort by price (asc)
 #   ?ordering=-price                      - Sort by price (desc)
+#   ?ordering=-popularity                 - Best sellers first (recent sales + wishlists)
+#
+# Response shaping (product, category, cart, wishlist and order endpoints):
+#   ?fields=id,price,stock                - Only these fields
+#   ?fields=id,quantity,product.price     - Dotted paths for nested objects
+#   ?expand=category                      - Embed the category instead of its id
+#
+# Pagination (all list endpoints):
+#   ?page=2                               - Page number (default, includes count)
+#   ?pagination=cursor                    - Keyset pages; follow next/previous links
+#
+# HOME
+# ----
+# GET  /api/home/                         - Categories, featured, new arrivals
+#                                           and on sale products in one response
+#
+# FEEDS
+# -----
+# GET  /api/feeds/products.ndjson         - Every active product, one JSON per line
+# GET  /api/feeds/products.csv            - Same rows as CSV with a header
+# GET  /api/feeds/products.xml            - Google Merchant RSS (g: namespace)
+#      Streamed; gzip-compressed when the client sends Accept-Encoding: gzip
 #
 # AUTHENTICATION
 # --------------
@@ -90,6 +124,8 @@ urlpatterns = [
 #        Body: { quantity }
 # DELETE /api/cart/{id}/                  - Remove item from cart
 # DELETE /api/cart/clear/                 - Clear entire cart
+# POST   /api/cart/batch/                 - Apply a cart diff, returns the cart
+#        Body: { operations: [{ product_id, action: set|add|remove, quantity }] }
 #
 # WISHLIST (auth required)
 # ------------------------
@@ -1,20 +1,45 @@
-from rest_framework import viewsets, filters, status, generics
+from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.db.models import Q, Sum, F
+from django.db.models import (
+    BooleanField, Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When, Window
+)
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+)
 from django.contrib.auth.models import User
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET, require_safe
 from decimal import Decimal
-
-from .models import Category, Product, UserProfile, Order, CartItem, Wishlist
+from pathlib import Path
+import hashlib
+import mimetypes
+import re
+
+from .cache import catalog_version, get_or_set_catalog
+from .feeds import FEED_FORMATS, feed_stream
+from .filters import ProductOrderingFilter
+from .resize import CONTENT_TYPES, ResizeError, negotiate_format, resized_file
+from .models import (
+    Category, Product, RelatedProduct, UserProfile, Order, CartItem, Wishlist
+)
+from .search import search_products
+from .storage import HASHED_PATH
+from .snapshot import snapshot_list_response
+from .streaming import json_array_stream
 from .serializers import (
     CategorySerializer,
+    FastProductListSerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     UserSerializer,
     RegisterSerializer,
     UpdateProfileSerializer,
+    CartBatchSerializer,
     CartItemSerializer,
     WishlistSerializer,
     OrderSerializer,
@@ -97,7 +122,72 @@ def change_password(request):
 # PRODUCT VIEWS
 # =====================================================
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalCatalogMixin:
+    """
+    ETag / Last-Modified for read-only catalog endpoints.
+
+    Validators come from the catalog version row (bumped after every
+    Product, ProductImage and Category write, see shop/cache.py), which every
+    worker reads from the database, so answering 304 costs one primary key
+    lookup and no serialization. Unlike max(updated_at) it also changes on
+    deletes, deactivations and category edits embedded in product payloads.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        version = catalog_version(request)
+        variant = f"{version}:{request.build_absolute_uri()}:{request.META.get('HTTP_ACCEPT', '')}"
+        self.etag = quote_etag(hashlib.md5(variant.encode()).hexdigest())
+        self.last_modified = version // 10 ** 9
+
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=self.last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            response['Last-Modified'] = http_date(self.last_modified)
+            # Let clients store responses but always revalidate them
+            patch_cache_control(response, no_cache=True)
+        return response
+
+
+RAIL_SIZE = 8
+
+
+def product_rails(queryset):
+    """Curated rails (featured, new arrivals, on sale) over a product queryset"""
+    return {
+        'featured': queryset.filter(is_featured=True)[:RAIL_SIZE],
+        'new_arrivals': queryset.order_by('-created_at')[:RAIL_SIZE],
+        'on_sale': queryset.filter(
+            original_price__isnull=False,
+            original_price__gt=0
+        )[:RAIL_SIZE],
+    }
+
+
+class CategoryViewSet(ConditionalCatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for categories.
     
@@ -110,21 +200,43 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=['get'])
     def products(self, request, slug=None):
-        """Get all products in a category: GET /api/categories/{slug}/products/"""
+        """
+        Get products in a category: GET /api/categories/{slug}/products/
+        Paginated, with the same filters and ordering as /api/products/.
+        ?stream=true streams every match as one JSON array instead.
+        """
         category = self.get_object()
-        products = Product.objects.filter(
-            category=category,
-            is_active=True
-        )
-        serializer = ProductListSerializer(
-            products,
-            many=True,
-            context={'request': request}
+
+        # Reuse ProductViewSet filtering, ordering and pagination
+        view = ProductViewSet(
+            request=request,
+            format_kwarg=self.format_kwarg,
+            action='list',
+            args=(),
+            kwargs={}
         )
-        return Response(serializer.data)
+        products = view.filter_queryset(view.get_queryset()).filter(category=category)
+
+        def serialize(items):
+            return ProductListSerializer(
+                items,
+                many=True,
+                context={'request': request}
+            ).data
+
+        if request.query_params.get('stream') == 'true':
+            return StreamingHttpResponse(
+                json_array_stream(products, serialize),
+                content_type='application/json'
+            )
+
+        page = view.paginate_queryset(products)
+        if page is not None:
+            return view.get_paginated_response(serialize(page))
+        return Response(serialize(products))
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(ConditionalCatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for products.
     
@@ -133,25 +245,68 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     
     Query params:
     - category: filter by category slug
-    - search: search in name and description
+    - search: full-text search (name, descriptions, artisan, materials), ranked by relevance
     - badge: filter by badge (new, bestseller, sale, etc.)
     - min_price: minimum price filter
     - max_price: maximum price filter
     - in_stock: true/false
     - featured: true/false
-    - ordering: price, -price, name, -name, created_at, -created_at
+    - ordering: price, -price, name, -name, created_at, -created_at, -popularity
     """
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).select_related(
+        'category', 'primary_image'
+    )
     lookup_field = 'slug'
-    filter_backends = [filters.OrderingFilter]
-    ordering_fields = ['price', 'name', 'created_at']
+    filter_backends = [ProductOrderingFilter]
+    ordering_fields = ['price', 'name', 'created_at', 'popularity']
     ordering = ['-is_featured', '-created_at']
 
+    # Price facet buckets in GTQ: [min, max)
+    PRICE_BUCKETS = [
+        (Decimal('0'), Decimal('100')),
+        (Decimal('100'), Decimal('250')),
+        (Decimal('250'), Decimal('500')),
+        (Decimal('500'), None),
+    ]
+    # Largest Product.price (max_digits=10, decimal_places=2)
+    MAX_PRICE = Decimal('99999999.99')
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductDetailSerializer
         return ProductListSerializer
 
+    def list(self, request, *args, **kwargs):
+        if settings.CATALOG_SNAPSHOT:
+            response = snapshot_list_response(self, request)
+            if response is not None:
+                return response
+        if self.use_fast_serializer():
+            queryset = FastProductListSerializer.values(
+                self.filter_queryset(self.get_queryset())
+            )
+            page = self.paginate_queryset(queryset)
+            serializer = FastProductListSerializer(
+                page if page is not None else queryset,
+                context=self.get_serializer_context()
+            )
+            if page is not None:
+                return self.get_paginated_response(serializer.data)
+            return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
+    def use_fast_serializer(self):
+        """Fast path unless the response is shaped or keyset paginated"""
+        params = self.request.query_params
+        paginator = self.paginator
+        return settings.FAST_LIST_SERIALIZATION and not (
+            params.get('fields') or params.get('expand') or
+            (paginator is not None and (
+                params.get(paginator.mode_query_param) == 'cursor' or
+                paginator.cursor_query_param in params
+            ))
+        )
+
     def get_queryset(self):
         queryset = super().get_queryset()
         params = self.request.query_params
@@ -161,30 +316,26 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         if category:
             queryset = queryset.filter(category__slug=category)
 
-        # Search
+        # Search (full-text, ranked by relevance unless ?ordering= is given)
         search = params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(short_description__icontains=search) |
-                Q(artisan_name__icontains=search) |
-                Q(materials__icontains=search)
-            )
+            queryset = search_products(queryset, search)
+            self.ordering = ['-search_rank', *ProductViewSet.ordering]
 
         # Filter by badge
         badge = params.get('badge')
         if badge:
             queryset = queryset.filter(badge=badge)
 
-        # Price range
+        # Price range, always closed: SQLite rates a one-sided range as
+        # unselective and drives the category join from shop_category,
+        # reading every active product, instead of product_active_price_idx
         min_price = params.get('min_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        
         max_price = params.get('max_price')
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+        if min_price or max_price:
+            queryset = queryset.filter(
+                price__range=(min_price or 0, max_price or self.MAX_PRICE)
+            )
 
         # In stock filter
         in_stock = params.get('in_stock')
@@ -200,47 +351,406 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    def cached_rail(self, name, products):
+        """Serialized rail, cached until the next catalog write"""
+        if self.use_fast_serializer():
+            return get_or_set_catalog(name, self.request, lambda: (
+                FastProductListSerializer(
+                    FastProductListSerializer.values(products),
+                    context={'request': self.request}
+                ).data
+            ))
+        return get_or_set_catalog(name, self.request, lambda: list(
+            ProductListSerializer(
+                products,
+                many=True,
+                context={'request': self.request}
+            ).data
+        ))
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products: GET /api/products/featured/"""
-        products = self.get_queryset().filter(is_featured=True)[:8]
-        serializer = ProductListSerializer(
-            products,
-            many=True,
-            context={'request': request}
-        )
-        return Response(serializer.data)
+        products = product_rails(self.get_queryset())['featured']
+        return Response(self.cached_rail('featured', products))
 
     @action(detail=False, methods=['get'])
     def new_arrivals(self, request):
         """Get newest products: GET /api/products/new_arrivals/"""
-        products = self.get_queryset().order_by('-created_at')[:8]
-        serializer = ProductListSerializer(
-            products,
-            many=True,
-            context={'request': request}
-        )
-        return Response(serializer.data)
+        products = product_rails(self.get_queryset())['new_arrivals']
+        return Response(self.cached_rail('new_arrivals', products))
 
     @action(detail=False, methods=['get'])
     def on_sale(self, request):
         """Get products on sale: GET /api/products/on_sale/"""
-        products = self.get_queryset().filter(
-            original_price__isnull=False,
-            original_price__gt=0
-        )[:8]
-        serializer = ProductListSerializer(
+        products = product_rails(self.get_queryset())['on_sale']
+        return Response(self.cached_rail('on_sale', products))
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, slug=None):
+        """
+        Customers also bought: GET /api/products/{slug}/related/
+        Co-purchase neighbours (see recommendations.py), topped up with
+        products from the same category.
+        """
+        def build():
+            product = self.get_object()
+            products = [
+                row.related for row in RelatedProduct.objects.filter(
+                    product=product,
+                    related__is_active=True
+                ).select_related(
+                    'related__category', 'related__primary_image'
+                )[:RAIL_SIZE]
+            ]
+            if len(products) < RAIL_SIZE:
+                products += Product.objects.filter(
+                    is_active=True,
+                    category_id=product.category_id
+                ).exclude(
+                    pk__in=[product.pk, *(p.pk for p in products)]
+                ).select_related(
+                    'category', 'primary_image'
+                )[:RAIL_SIZE - len(products)]
+            return list(ProductListSerializer(
+                products,
+                many=True,
+                context=self.get_serializer_context()
+            ).data)
+
+        return Response(get_or_set_catalog('related', request, build))
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Facet counts for the current filters: GET /api/products/facets/
+        Accepts the same query params as the list endpoint.
+        """
+        price_bucket = Case(
+            *[
+                When(
+                    price__gte=low,
+                    **({'price__lt': high} if high is not None else {}),
+                    then=Value(index)
+                )
+                for index, (low, high) in enumerate(self.PRICE_BUCKETS)
+            ],
+            output_field=IntegerField()
+        )
+        # One GROUP BY over every facet dimension, rolled up below
+        rows = self.get_queryset().order_by().annotate(
+            price_bucket=price_bucket,
+            has_stock=Case(
+                When(stock__gt=0, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            )
+        ).values(
+            'category__slug', 'category__name', 'category__order',
+            'badge', 'has_stock', 'price_bucket'
+        ).annotate(count=Count('pk'))
+
+        categories = {}
+        badges = {}
+        in_stock = {'true': 0, 'false': 0}
+        prices = [0] * len(self.PRICE_BUCKETS)
+        total = 0
+        for row in rows:
+            count = row['count']
+            total += count
+            category = categories.setdefault(row['category__slug'], {
+                'slug': row['category__slug'],
+                'name': row['category__name'],
+                'order': row['category__order'],
+                'count': 0,
+            })
+            category['count'] += count
+            badges[row['badge']] = badges.get(row['badge'], 0) + count
+            in_stock['true' if row['has_stock'] else 'false'] += count
+            if row['price_bucket'] is not None:
+                prices[row['price_bucket']] += count
+
+        badge_labels = dict(Product.BADGE_CHOICES)
+        return Response({
+            'total': total,
+            'categories': [
+                {key: value for key, value in category.items() if key != 'order'}
+                for category in sorted(
+                    categories.values(),
+                    key=lambda category: (category['order'], category['name'])
+                )
+            ],
+            'badges': [
+                {'value': value, 'label': label, 'count': badges[value]}
+                for value, label in Product.BADGE_CHOICES
+                if value and value in badges
+            ],
+            'in_stock': in_stock,
+            'price': [
+                {
+                    'min_price': str(low),
+                    'max_price': str(high) if high is not None else None,
+                    'count': prices[index],
+                }
+                for index, (low, high) in enumerate(self.PRICE_BUCKETS)
+            ],
+        })
+
+
+class HomeView(ConditionalCatalogMixin, generics.GenericAPIView):
+    """
+    Every homepage section in one request
+    GET /api/home/
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if request.user.is_authenticated:
+            return Response(self.build())
+        return Response(get_or_set_catalog('home', request, self.build))
+
+    def build(self):
+        active = Product.objects.filter(is_active=True)
+
+        # One fetch for the union of the rails, products shared between
+        # rails are loaded and serialized once
+        in_any_rail = Q()
+        for rail in product_rails(active).values():
+            in_any_rail |= Q(pk__in=rail.values('pk'))
+        products = list(
+            active.filter(in_any_rail).select_related('category', 'primary_image')
+        )
+        serialized = ProductListSerializer(
             products,
             many=True,
-            context={'request': request}
+            context={'request': self.request}
+        ).data
+        data = {product.pk: item for product, item in zip(products, serialized)}
+
+        # Rebuild each rail's order (see product_rails) from the shared rows
+        by_default = sorted(
+            products,
+            key=lambda product: (product.is_featured, product.created_at),
+            reverse=True
         )
-        return Response(serializer.data)
+        by_newest = sorted(
+            products,
+            key=lambda product: product.created_at,
+            reverse=True
+        )
+        rails = {
+            'featured': [p for p in by_default if p.is_featured],
+            'new_arrivals': by_newest,
+            'on_sale': [
+                p for p in by_default
+                if p.original_price is not None and p.original_price > 0
+            ],
+        }
+
+        categories = CategorySerializer(
+            Category.objects.filter(is_active=True),
+            many=True,
+            context={'request': self.request}
+        ).data
+        return {
+            'categories': list(categories),
+            **{
+                name: [data[product.pk] for product in rail[:RAIL_SIZE]]
+                for name, rail in rails.items()
+            },
+        }
+
+
+# =====================================================
+# PRODUCT FEEDS
+# =====================================================
+
+def accepts_gzip(request):
+    """gzip, or *, listed in Accept-Encoding with a non-zero q-value"""
+    qvalues = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = coding.split(';')
+        qvalue = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[name.strip().lower()] = qvalue
+    return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+
+
+@require_GET
+def product_feed(request, feed_format):
+    """
+    Full active catalog for marketplaces and ad platforms, streamed
+    GET /api/feeds/products.ndjson | products.csv | products.xml
+    """
+    # Plain Django view: DRF content negotiation would reject feed readers'
+    # Accept headers, and the body never passes through a renderer
+    if feed_format not in FEED_FORMATS:
+        raise Http404
+    compress = accepts_gzip(request)
+    response = StreamingHttpResponse(
+        feed_stream(feed_format, request.build_absolute_uri('/'), compress),
+        content_type=f'{FEED_FORMATS[feed_format]}; charset=utf-8'
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = f'inline; filename="products.{feed_format}"'
+    return response
+
+
+# =====================================================
+# MEDIA
+# =====================================================
+
+@require_safe
+def resize_image(request, width, height, path):
+    """
+    MEDIA_ROOT image resized to fit width x height (0 = free side), each
+    side rounded up to one of resize.RESIZE_SIZES
+    GET /media/resize/<w>x<h>/<path>?fit=contain|cover
+    AVIF or WebP when the Accept header allows it, JPEG otherwise.
+    """
+    fmt = negotiate_format(request.META.get('HTTP_ACCEPT', ''))
+    try:
+        file, key = resized_file(
+            path, width, height, request.GET.get('fit', 'contain'), fmt
+        )
+    except ResizeError:
+        raise Http404
+
+    etag = quote_etag(key)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        file.close()
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(file, content_type=CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.IMAGE_RESIZE_MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def requested_range(request, size, etag):
+    """(start, end) of a single satisfiable Range, None for the whole file"""
+    header = request.META.get('HTTP_RANGE', '')
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Absent, multipart or malformed: send everything
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def file_range(file, start, length, chunk_size=64 * 1024):
+    with file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Uploaded media with validators and byte ranges
+    GET /media/<path>
+    Content-hashed names (see storage.py) are cached as immutable.
+    """
+    root = Path(settings.MEDIA_ROOT).resolve()
+    file_path = (root / path).resolve()
+    if root not in file_path.parents or not file_path.is_file():
+        raise Http404
+
+    stat = file_path.stat()
+    size = stat.st_size
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{size:x}')
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'
+        try:
+            byte_range = requested_range(request, size, etag)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is None:
+            # wsgi.file_wrapper (sendfile) where the server supports it
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                file_range(open(file_path, 'rb'), start, end - start + 1),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    if HASHED_PATH.search(path):
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
 
 
 # =====================================================
 # CART VIEWS
 # =====================================================
 
+def cart_payload(request):
+    """
+    Cart lines and totals in one query: the totals are window sums over
+    the same rows, so an empty cart returns no rows and zero totals
+    """
+    items = list(
+        CartItem.objects.filter(user=request.user).select_related(
+            'product__category', 'product__primary_image'
+        ).annotate(
+            cart_subtotal=Window(Sum(
+                F('quantity') * F('product__price'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )),
+            cart_items=Window(Sum('quantity')),
+        )
+    )
+    # SQLite hands window sums back without the field's scale
+    subtotal = items[0].cart_subtotal.quantize(Decimal('0.01')) if items else 0
+    shipping = CartItem.shipping_for(subtotal)
+    serializer = CartItemSerializer(items, many=True, context={'request': request})
+    return {
+        'items': serializer.data,
+        'total_items': items[0].cart_items if items else 0,
+        'subtotal': str(subtotal),
+        'shipping': str(shipping),
+        'total': str(subtotal + shipping)
+    }
+
+
 class CartView(generics.GenericAPIView):
     """
     User cart management
@@ -252,22 +762,7 @@ class CartView(generics.GenericAPIView):
 
     def get(self, request):
         """Get user's cart with totals"""
-        items = CartItem.objects.filter(user=request.user).select_related('product')
-        
-        # Calculate totals
-        subtotal = sum(item.subtotal for item in items)
-        shipping = Decimal('0') if subtotal >= 500 else Decimal('35')
-        total = subtotal + shipping
-        
-        serializer = CartItemSerializer(items, many=True, context={'request': request})
-        
-        return Response({
-            'items': serializer.data,
-            'total_items': sum(item.quantity for item in items),
-            'subtotal': str(subtotal),
-            'shipping': str(shipping),
-            'total': str(total)
-        })
+        return Response(cart_payload(request))
 
     def post(self, request):
         """Add item to cart"""
@@ -304,6 +799,20 @@ class CartItemView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cart_batch(request):
+    """
+    Apply a cart diff in one request
+    POST /api/cart/batch/
+    Body: { operations: [{ product_id, action: set|add|remove, quantity }] }
+    """
+    serializer = CartBatchSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return Response(cart_payload(request))
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def clear_cart(request):
@@ -329,7 +838,9 @@ class WishlistView(generics.ListCreateAPIView):
     serializer_class = WishlistSerializer
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user).select_related('product')
+        return Wishlist.objects.filter(user=self.request.user).select_related(
+            'product__category', 'product__primary_image'
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)